@@ -0,0 +1,186 @@
+"""
+Benchmark das rotinas de busca e das estratégias de escolha de alvo.
+
+Para cada tamanho de grid e seed, mede:
+ - Maze.astar, astarPlayer.astar2, DijkstraPlayer.dijkstra_multi_target e
+   HybridClusterPlayer.dijkstra_multi_target_completo em pares/consultas aleatórios;
+ - escolher_alvo de cada player em posições aleatórias (com a tabela de distâncias já aquecida,
+   mas sem caminhos no cache do mundo).
+
+Reporta ns/op, nós expandidos e inserções na fronteira por operação (contadores de
+pathfinding) e o pico de memória alocada (tracemalloc). Os números são comparados com a
+baseline salva em benchmarks/baseline.json para deixar regressões visíveis.
+
+Uso:
+    python benchmark.py                       # roda e compara com a baseline
+    python benchmark.py --salvar-baseline     # grava os resultados como nova baseline
+    python benchmark.py --tamanhos 50 100 --seeds 1 2 --repeticoes 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import main
+import pathfinding
+
+ARQUIVO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+
+# Players cuja decisão é cara demais para `consultas` estados por medição (o RolloutPlayer
+# simula o resto do episódio dezenas de vezes por decisão): medidos com menos estados
+CONSULTAS_MAXIMAS = {"RolloutPlayer": 5}
+
+
+def celulas_livres(world):
+    return [(x, y) for y, row in enumerate(world.map) for x, v in enumerate(row) if v == 0]
+
+
+def casos_de_busca(maze, rng, consultas):
+    """Rotinas de busca, cada uma como (função, número de operações que ela executa)."""
+    world = maze.world
+    livres = celulas_livres(world)
+    pares = [(rng.choice(livres), rng.choice(livres)) for _ in range(consultas)]
+    alvos = world.packages + world.goals
+    origem = world.player.position
+    astar_player = main.astarPlayer(origem)
+    dijkstra_player = main.DijkstraPlayer(origem)
+    cluster_player = main.HybridClusterPlayer(origem)
+
+    def sem_cache(busca):
+        # Maze.astar e astar2 passam pelo cache LRU do mundo: sem esvaziá-lo, as repetições
+        # de medir mediriam só consultas ao cache, não o A*
+        def executar():
+            world.cache_caminhos.limpar()
+            return [busca(a, b) for a, b in pares]
+        return executar
+
+    return {
+        "Maze.astar": (sem_cache(maze.astar), consultas),
+        "astarPlayer.astar2": (sem_cache(lambda a, b: astar_player.astar2(a, b, world)), consultas),
+        "DijkstraPlayer.dijkstra_multi_target":
+            (lambda: [dijkstra_player.dijkstra_multi_target(a, alvos, world) for a, _ in pares], consultas),
+        "HybridClusterPlayer.dijkstra_multi_target_completo":
+            (lambda: [cluster_player.dijkstra_multi_target_completo(a, alvos, world) for a, _ in pares], consultas),
+    }
+
+
+def casos_de_decisao(seed, config_mundo, rng, consultas):
+    """escolher_alvo de cada player, chamado a partir de posições e cargas aleatórias."""
+    casos = {}
+    for nome, cls in main.PLAYERS.items():
+        maze = main.Maze(seed=seed, player_class=cls, headless=True, verbose=False, **config_mundo)
+        world = maze.world
+        player = world.player
+        livres = celulas_livres(world)
+        n = min(consultas, CONSULTAS_MAXIMAS.get(nome, consultas))
+        estados = [(rng.choice(livres), rng.randint(0, 1), rng.randint(10, 90)) for _ in range(n)]
+
+        inicial = player.estado()
+
+        def decidir(player=player, world=world, estados=estados, inicial=inicial):
+            # Cada repetição começa do mesmo estado: sem caminhos no cache LRU e sem o que o
+            # player guardou na repetição anterior (o plano do TourPlayer, por exemplo);
+            # só a tabela de distâncias continua aquecida
+            world.cache_caminhos.limpar()
+            player.restaurar_estado(inicial)
+            for pos, cargo, bateria in estados:
+                player.position, player.cargo, player.battery = pos, cargo, bateria
+                player.escolher_alvo(world)
+
+        decidir()  # aquece a tabela de distâncias do mundo
+        casos[f"{nome}.escolher_alvo"] = (decidir, n)
+    return casos
+
+
+def medir(funcao, operacoes, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        pathfinding.zerar_contadores()
+        inicio = time.perf_counter_ns()
+        funcao()
+        tempos.append(time.perf_counter_ns() - inicio)
+    contadores = dict(pathfinding.contadores)
+
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "ns_op": min(tempos) / operacoes,
+        "expandidos_op": contadores["expandidos"] / operacoes,
+        "empilhados_op": contadores["empilhados"] / operacoes,
+        "pico_kb": pico / 1024,
+    }
+
+
+def rodar(tamanhos, seeds, consultas, repeticoes):
+    resultados = {}
+    for tamanho in tamanhos:
+        config_mundo = {"maze_size": tamanho, "total_items": max(6, tamanho // 8)}
+        por_caso = {}
+        for seed in seeds:
+            rng = random.Random(seed)
+            maze = main.Maze(seed=seed, player_class=main.DefaultPlayer, headless=True, verbose=False, **config_mundo)
+            casos = casos_de_busca(maze, rng, consultas)
+            casos.update(casos_de_decisao(seed, config_mundo, rng, consultas))
+            for nome, (funcao, operacoes) in casos.items():
+                por_caso.setdefault(nome, []).append(medir(funcao, operacoes, repeticoes))
+        for nome, medidas in por_caso.items():
+            resultados[f"{nome}@{tamanho}"] = {
+                chave: round(statistics.mean(m[chave] for m in medidas), 2) for chave in medidas[0]
+            }
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Imprime a tabela de resultados e devolve a lista de regressões em relação à baseline."""
+    regressoes = []
+    print(f"{'caso':<62} {'ns/op':>12} {'expand/op':>10} {'push/op':>10} {'pico KiB':>9}  vs baseline")
+    for chave, r in resultados.items():
+        base = baseline.get(chave)
+        nota = ""
+        if base:
+            razao = r["ns_op"] / base["ns_op"] if base["ns_op"] else 1.0
+            nota = f"{razao:5.2f}x"
+            if razao > 1 + tolerancia:
+                nota += "  REGRESSÃO (tempo)"
+                regressoes.append(chave)
+            if r["expandidos_op"] > base["expandidos_op"]:
+                nota += "  REGRESSÃO (nós expandidos)"
+                regressoes.append(chave)
+        print(f"{chave:<62} {r['ns_op']:>12.0f} {r['expandidos_op']:>10.1f} {r['empilhados_op']:>10.1f} {r['pico_kb']:>9.1f}  {nota}")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das buscas e estratégias do Delivery Bot")
+    parser.add_argument("--tamanhos", nargs='+', type=int, default=[50, 100], help="Lados de grid a medir")
+    parser.add_argument("--seeds", nargs='+', type=int, default=[1, 2, 3], help="Seeds dos mundos")
+    parser.add_argument("--consultas", type=int, default=50, help="Operações por medição")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições por medição (usa o menor tempo)")
+    parser.add_argument("--baseline", default=ARQUIVO_BASELINE, help="Arquivo JSON da baseline")
+    parser.add_argument("--salvar-baseline", action="store_true", help="Grava os resultados como nova baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Aumento relativo de tempo tolerado (padrão: 0.5)")
+    args = parser.parse_args()
+
+    resultados = rodar(args.tamanhos, args.seeds, args.consultas, args.repeticoes)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+
+    if args.salvar_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(resultados, f, indent=2, sort_keys=True)
+        print(f"Baseline gravada em {args.baseline}")
+    elif regressoes:
+        print(f"{len(regressoes)} regressões em relação à baseline")
+        sys.exit(1)
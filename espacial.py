@@ -0,0 +1,164 @@
+"""
+Índice espacial em baldes de grid para os pontos de interesse (pacotes e metas).
+
+Os pontos são distribuídos em baldes quadrados de `tamanho_balde` células; as consultas de mais
+próximos (distância de Manhattan) percorrem anéis de baldes a partir da posição e param assim
+que nenhum balde ainda não visto pode ter um ponto mais perto. Cada ponto guarda a ordem em que
+foi inserido, e os empates são sempre resolvidos por ela: o resultado é o mesmo de varrer a
+lista original com `<` estrito.
+
+O índice também mantém, para cada ponto, quantos outros estão a até `raio_cluster` dele
+(a pontuação de cluster do HybridClusterPlayer), atualizada a cada inserção e remoção em vez de
+recalculada por consulta.
+"""
+
+# Até esse número de pontos, mais_proximo varre todos em vez de percorrer os baldes
+LIMITE_VARREDURA = 32
+
+
+class IndiceEspacial:
+    __slots__ = ("tamanho_balde", "raio_cluster", "_baldes", "_ordem", "_pontos", "_vizinhos", "_proxima")
+
+    def __init__(self, pontos=(), tamanho_balde=8, raio_cluster=10):
+        self.tamanho_balde = tamanho_balde
+        self.raio_cluster = raio_cluster
+        self._baldes = {}     # (bx, by) -> {ordem: ponto}
+        self._ordem = {}      # (x, y) -> ordem de inserção
+        self._pontos = {}     # ordem -> ponto, na ordem de inserção
+        self._vizinhos = {}   # ordem -> pontos a até raio_cluster
+        self._proxima = 0
+        for ponto in pontos:
+            self.inserir(ponto)
+
+    def copiar(self):
+        """Cópia independente (mesmos pontos, ordens e contagens), sem recalcular os vizinhos."""
+        copia = IndiceEspacial.__new__(IndiceEspacial)
+        copia.tamanho_balde = self.tamanho_balde
+        copia.raio_cluster = self.raio_cluster
+        copia._baldes = {chave: dict(balde) for chave, balde in self._baldes.items()}
+        copia._ordem = dict(self._ordem)
+        copia._pontos = dict(self._pontos)
+        copia._vizinhos = dict(self._vizinhos)
+        copia._proxima = self._proxima
+        return copia
+
+    def __len__(self):
+        return len(self._pontos)
+
+    def __iter__(self):
+        return iter(self._pontos.values())
+
+    def __contains__(self, pos):
+        return (pos[0], pos[1]) in self._ordem
+
+    def _balde(self, x, y):
+        return x // self.tamanho_balde, y // self.tamanho_balde
+
+    def _no_raio(self, x, y, raio):
+        """(ordem, ponto) dos pontos a até raio de (x, y), em ordem de inserção."""
+        t = self.tamanho_balde
+        encontrados = []
+        for bx in range((x - raio) // t, (x + raio) // t + 1):
+            for by in range((y - raio) // t, (y + raio) // t + 1):
+                balde = self._baldes.get((bx, by))
+                if not balde:
+                    continue
+                for ordem, ponto in balde.items():
+                    if abs(ponto[0] - x) + abs(ponto[1] - y) <= raio:
+                        encontrados.append((ordem, ponto))
+        encontrados.sort(key=lambda item: item[0])
+        return encontrados
+
+    def inserir(self, ponto):
+        x, y = ponto[0], ponto[1]
+        if (x, y) in self._ordem:
+            return
+        ordem = self._proxima
+        self._proxima += 1
+        vizinhos = self._no_raio(x, y, self.raio_cluster)
+        for outra, _ in vizinhos:
+            self._vizinhos[outra] += 1
+        self._vizinhos[ordem] = len(vizinhos)
+        self._ordem[(x, y)] = ordem
+        self._pontos[ordem] = ponto
+        self._baldes.setdefault(self._balde(x, y), {})[ordem] = ponto
+
+    def remover(self, pos):
+        x, y = pos[0], pos[1]
+        ordem = self._ordem.pop((x, y), None)
+        if ordem is None:
+            return
+        del self._pontos[ordem]
+        del self._vizinhos[ordem]
+        chave = self._balde(x, y)
+        balde = self._baldes[chave]
+        del balde[ordem]
+        if not balde:
+            del self._baldes[chave]
+        for outra, _ in self._no_raio(x, y, self.raio_cluster):
+            self._vizinhos[outra] -= 1
+
+    def vizinhos(self, pos):
+        """Quantos outros pontos estão a até raio_cluster de pos (pos precisa estar no índice)."""
+        return self._vizinhos[self._ordem[(pos[0], pos[1])]]
+
+    def no_raio(self, pos, raio):
+        """Pontos a até raio (Manhattan) de pos, em ordem de inserção."""
+        return [ponto for _, ponto in self._no_raio(pos[0], pos[1], raio)]
+
+    def contar_no_raio(self, pos, raio):
+        return len(self._no_raio(pos[0], pos[1], raio))
+
+    def mais_proximos(self, pos, k=1):
+        """
+        Os k pontos mais próximos de pos (Manhattan) como [(ponto, distância)], ordenados por
+        (distância, ordem de inserção).
+        """
+        if not self._pontos or k <= 0:
+            return []
+        x, y = pos[0], pos[1]
+        t = self.tamanho_balde
+        cx, cy = self._balde(x, y)
+        candidatos = []
+        vistos = 0
+        anel = 0
+        while True:
+            for bx in range(cx - anel, cx + anel + 1):
+                if bx in (cx - anel, cx + anel):
+                    colunas = range(cy - anel, cy + anel + 1)
+                else:
+                    colunas = (cy - anel, cy + anel)
+                for by in colunas:
+                    balde = self._baldes.get((bx, by))
+                    if not balde:
+                        continue
+                    vistos += len(balde)
+                    for ordem, ponto in balde.items():
+                        candidatos.append((abs(ponto[0] - x) + abs(ponto[1] - y), ordem, ponto))
+            if vistos == len(self._pontos):
+                break
+            # Os baldes fora dos anéis já vistos estão a mais de anel * t de pos
+            if len(candidatos) >= k:
+                candidatos.sort(key=lambda item: item[:2])
+                del candidatos[k:]
+                if candidatos[-1][0] <= anel * t:
+                    break
+            anel += 1
+        candidatos.sort(key=lambda item: item[:2])
+        return [(ponto, d) for d, _, ponto in candidatos[:k]]
+
+    def mais_proximo(self, pos):
+        """(ponto, distância) do ponto mais próximo de pos, ou (None, float('inf'))."""
+        if len(self._pontos) <= LIMITE_VARREDURA:
+            # Poucos pontos: a varredura direta custa menos que percorrer os baldes
+            x, y = pos[0], pos[1]
+            melhor = None
+            melhor_d = float('inf')
+            for ponto in self._pontos.values():
+                d = abs(ponto[0] - x) + abs(ponto[1] - y)
+                if d < melhor_d:
+                    melhor_d = d
+                    melhor = ponto
+            return melhor, melhor_d
+        proximos = self.mais_proximos(pos, 1)
+        return proximos[0] if proximos else (None, float('inf'))
@@ -1,133 +1,145 @@
-import pygame
 import random
-import heapq
 import sys
 import argparse
+import copy
 import csv  
+import multiprocessing
 import os   
+import queue
+import threading
 import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from abc import ABC, abstractmethod
 
+import espacial
+import pathfinding
+import rotas
+
+try:
+    import pygame
+except ImportError:  # o modo headless não depende do pygame
+    pygame = None
+
+# Formatos colunares de resultados (opcionais; o CSV não depende deles)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # ==========================
 # CLASSES DE PLAYER
 # ==========================
+# Resultado opcional de escolher_alvo: o alvo junto do caminho (posições após a atual, como
+# em Maze.astar) e do custo já calculados, para o Maze não buscar o mesmo caminho de novo.
+Decisao = namedtuple("Decisao", ["alvo", "caminho", "custo"])
+
+# Estado visível de um instante da simulação, publicado para o renderer no modo desacoplado
+Quadro = namedtuple("Quadro", ["jogador", "caminho", "pacotes", "metas"])
+
+# Perfis de bateria: fração do custo (destino + volta ao recarregador) que a bateria precisa
+# cobrir para o robô seguir até o destino. None: segue sempre, sem checar a bateria.
+PERFIS_BATERIA = {
+    "conservador": 1.0,
+    "balanceado": 0.8,
+    "aventureiro": None,
+}
+
 class BasePlayer(ABC):
     """
     Classe base para o jogador (robô).
     Para criar uma nova estratégia de jogador, basta herdar dessa classe e implementar o método escolher_alvo.
+    Os atributos ficam em __slots__ (subclasses declaram os seus, ou __slots__ = ()), e as
+    posições são sempre tuplas (x, y), como todas as coordenadas do jogo.
     """
-    def __init__(self, position):
-        self.position = position  # Posição no grid [x, y]
+    __slots__ = ("position", "cargo", "battery", "perfil_bateria", "margem_bateria")
+
+    def __init__(self, position, perfil_bateria="aventureiro", margem_bateria=None):
+        self.position = position  # Posição no grid (x, y)
         self.cargo = 0            # Número de pacotes atualmente carregados
         self.battery = 90        # Nível da bateria
-        self.perfil_bateria = 'aventureiro' # 'conservador', 'balanceado' ou 'aventureiro'
+        self.perfil_bateria = perfil_bateria  # 'conservador', 'balanceado' ou 'aventureiro'
+        # margem_bateria substitui a fração do perfil (veja PERFIS_BATERIA); perfis desconhecidos
+        # se comportam como o conservador
+        self.margem_bateria = PERFIS_BATERIA.get(perfil_bateria, 1.0) if margem_bateria is None else margem_bateria
 
     @abstractmethod
     def escolher_alvo(self, world):
         """
-        Retorna o alvo (posição) que o jogador deseja ir.
+        Retorna o alvo (posição) que o jogador deseja ir, ou uma Decisao com o alvo e o
+        caminho até ele já planejado (veja decidir).
         Recebe o objeto world para acesso a pacotes e metas.
         """
         pass
 
+    def decidir(self, world, alvo):
+        """
+        Monta a Decisao para alvo com o caminho do cache do mundo (uma única busca por decisão,
+        reaproveitada pelo Maze). Retorna None se não houver alvo.
+        """
+        if alvo is None:
+            return None
+        custo, caminho = world.caminho(self.position, alvo)
+        return Decisao(alvo, caminho, custo)
+
     def pode_visitar_e_recarregar(self, custo_ate_destino, custo_ate_recarregador):
             """
             Verifica se o robô tem bateria suficiente para ir até o destino e depois até o recarregador.
             Os custos já devem ser previamente calculados.
             """
+            if self.margem_bateria is None:
+                return True
             custo_total = custo_ate_destino + custo_ate_recarregador
+            return self.battery >= custo_total * self.margem_bateria
 
-            if self.perfil_bateria == "conservador":
-                return self.battery >= custo_total
-            elif self.perfil_bateria == "balanceado":
-                return self.battery >= custo_total * 0.8
-            elif self.perfil_bateria == "aventureiro":
-                return True
-            else:
-                return self.battery >= custo_total  # padrão: conservador
+    def estado(self):
+        """Estado mutável do jogador, como tupla (guardado por Maze.snapshot)."""
+        return (self.position, self.cargo, self.battery)
+
+    def restaurar_estado(self, estado):
+        self.position, self.cargo, self.battery = estado[:3]
+
+    def copiar(self):
+        """Cópia independente do jogador (usada por World.clonar)."""
+        copia = copy.copy(self)
+        copia.restaurar_estado(self.estado())
+        return copia
 
 class HybridClusterPlayer(BasePlayer):
+    __slots__ = ()
 
     def heuristic(self, a, b):
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
     def astar(self, start, goal, world):
-        maze = world.map
-        size = world.maze_size
-        neighbors = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        close_set = set()
-        gscore = {tuple(start): 0}
-        fscore = {tuple(start): self.heuristic(start, goal)}
-        oheap = []
-        heapq.heappush(oheap, (fscore[tuple(start)], tuple(start)))
-        while oheap:
-            current = heapq.heappop(oheap)[1]
-            if list(current) == goal:
-                return gscore[current]
-            close_set.add(current)
-            for dx, dy in neighbors:
-                neighbor = (current[0] + dx, current[1] + dy)
-                tentative_g = gscore[current] + 1
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 1:
-                        continue
-                else:
-                    continue
-                if neighbor in close_set and tentative_g >= gscore.get(neighbor, 0):
-                    continue
-                if tentative_g < gscore.get(neighbor, float('inf')) or neighbor not in [i[1] for i in oheap]:
-                    gscore[neighbor] = tentative_g
-                    fscore[neighbor] = tentative_g + self.heuristic(neighbor, goal)
-                    heapq.heappush(oheap, (fscore[neighbor], neighbor))
-        return float('inf')
+        return world.caminho(start, goal)[0]
 
     def dijkstra_multi_target_completo(self, start, alvos, world):
-        maze = world.map
-        size = world.maze_size
-        visited = set()
-        dist = {}
-        heap = [(0, tuple(start))]
-        alvos_set = set(map(tuple, alvos))
-
-        while heap and alvos_set:
-            current_dist, current = heapq.heappop(heap)
-            if current in visited:
-                continue
-            visited.add(current)
-
-            if current in alvos_set:
-                dist[current] = current_dist
-                alvos_set.remove(current)
-                if not alvos_set:
-                    break
-
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                neighbor = (current[0] + dx, current[1] + dy)
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 0:
-                        heapq.heappush(heap, (current_dist + 1, neighbor))
-
-        return dist
-
-    def pontuar_objetivo_cluster(self, alvo, todos, world, raio=10):
-        proximos = 0
-        for outro in todos:
-            if outro != alvo:
-                d = self.heuristic(alvo, outro)
-                if d <= raio:
-                    proximos += 1
-        return proximos
-
-    def escolher_melhor_com_cluster_eficiente(self, origem, candidatos, world):
-        distancias = self.dijkstra_multi_target_completo(origem, candidatos, world)
+        return world.grid.distancias_multi_target(start, alvos)
+
+    def pontuar_objetivo_cluster(self, alvo, indice, raio=10):
+        # Outros candidatos a até raio (Manhattan); no raio do índice a contagem já é mantida por ele
+        if raio == indice.raio_cluster:
+            return indice.vizinhos(alvo)
+        return indice.contar_no_raio(alvo, raio) - 1
+
+    def escolher_melhor_com_cluster_eficiente(self, origem, indice, world):
+        # A tabela usa os campos dos candidatos e, quando faltam mais de LIMITE_CAMPOS, uma
+        # única BFS a partir da origem
+        distancias = world.distancias.distancias(origem, indice)
         melhor_score = float('-inf')
         melhor_alvo = None
 
-        for alvo in candidatos:
-            custo = distancias.get(tuple(alvo), float('inf'))
+        for alvo in indice:
+            custo = distancias.get(alvo, float('inf'))
             if custo == float('inf'):
                 continue
-            cluster = self.pontuar_objetivo_cluster(alvo, candidatos, world)
+            cluster = self.pontuar_objetivo_cluster(alvo, indice)
             score = cluster * 3 - custo
             if score > melhor_score:
                 melhor_score = score
@@ -138,296 +150,188 @@ class HybridClusterPlayer(BasePlayer):
         pos_atual = self.position
         packages = world.packages
         goals = world.goals
-        pgs = packages + goals
-        custo_retorno = self.astar(pos_atual, world.recharger, world)
+        tabela = world.distancias
+        custo_retorno = tabela.distancia(world.recharger, pos_atual)
 
         if self.battery <= custo_retorno:
-            return world.recharger
+            return self.decidir(world, world.recharger)
 
         if self.cargo == 0 and packages:
-            alvo = self.escolher_melhor_com_cluster_eficiente(pos_atual, packages, world)
-            dist = self.astar(pos_atual, alvo, world)
-            dist_ret = self.astar(alvo, world.recharger, world)
-            return alvo if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger
+            alvo = self.escolher_melhor_com_cluster_eficiente(pos_atual, world.indice_pacotes, world)
+            dist = tabela.distancia(alvo, pos_atual)
+            dist_ret = tabela.distancia(world.recharger, alvo)
+            return self.decidir(world, alvo if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger)
 
         if self.cargo == len(goals):
-            alvo = self.escolher_melhor_com_cluster_eficiente(pos_atual, goals, world)
-            dist = self.astar(pos_atual, alvo, world)
-            dist_ret = self.astar(alvo, world.recharger, world)
-            return alvo if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger
+            alvo = self.escolher_melhor_com_cluster_eficiente(pos_atual, world.indice_metas, world)
+            dist = tabela.distancia(alvo, pos_atual)
+            dist_ret = tabela.distancia(world.recharger, alvo)
+            return self.decidir(world, alvo if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger)
 
         if self.cargo > 0 and packages:
-            alvo = self.escolher_melhor_com_cluster_eficiente(pos_atual, pgs, world)
-            dist = self.astar(pos_atual, alvo, world)
-            dist_ret = self.astar(alvo, world.recharger, world)
-            return alvo if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger
+            alvo = self.escolher_melhor_com_cluster_eficiente(pos_atual, world.indice_alvos, world)
+            dist = tabela.distancia(alvo, pos_atual)
+            dist_ret = tabela.distancia(world.recharger, alvo)
+            return self.decidir(world, alvo if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger)
 
         return None
 
 class astarPlayer(BasePlayer):
+    __slots__ = ()
     
     def heuristic2(self, a, b):
         # Distância de Manhattan
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
     def astar2(self, start, goal,world):
-        maze = world.map  # Acesso ao mapa do mundo
-        size = world.maze_size
-        neighbors = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        close_set = set()
-        gscore = {tuple(start): 0}
-        fscore = {tuple(start): self.heuristic2(start, goal)}
-        oheap = []
-        heapq.heappush(oheap, (fscore[tuple(start)], tuple(start)))
-        
-        while oheap:
-            current = heapq.heappop(oheap)[1]
-            if list(current) == goal:
-                return gscore[current]  # Retorna a distância total percorrida
-            
-            close_set.add(current)
-            for dx, dy in neighbors:
-                neighbor = (current[0] + dx, current[1] + dy)
-                tentative_g = gscore[current] + 1
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 1:
-                        continue
-                else:
-                    continue
-                if neighbor in close_set and tentative_g >= gscore.get(neighbor, 0):
-                    continue
-                if tentative_g < gscore.get(neighbor, float('inf')) or neighbor not in [i[1] for i in oheap]:
-                    gscore[neighbor] = tentative_g
-                    fscore[neighbor] = tentative_g + self.heuristic2(neighbor, goal)
-                    heapq.heappush(oheap, (fscore[neighbor], neighbor))
-        return float('inf')  # Retorna infinito se não houver caminho
+        # Retorna a distância total percorrida (infinito se não houver caminho)
+        return world.caminho(start, goal)[0]
 
     def escolher_alvo(self, world):
             pos_atual = self.position
             packages = world.packages
             goals = world.goals
-            pgs = packages + goals
-            custo_bateria = self.astar2(pos_atual, world.recharger, world)
+            pgs = world.indice_alvos  # pacotes e metas, sem montar uma lista nova
+            tabela = world.distancias
+            custo_bateria = tabela.distancia(world.recharger, pos_atual)
 
             if self.battery <= custo_bateria:
-                return world.recharger
+                return self.decidir(world, world.recharger)
             
 
             if self.cargo == 0 and packages:
-                melhor = min(packages, key=lambda p: self.astar2(pos_atual, p, world))
-                dist = self.astar2(pos_atual, melhor, world)
-                dist_ret = self.astar2(melhor, world.recharger, world)
-                return melhor if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger
+                distancias = tabela.distancias(pos_atual, packages)
+                melhor = min(packages, key=lambda p: distancias.get(p, float('inf')))
+                dist = distancias.get(melhor, float('inf'))
+                dist_ret = tabela.distancia(world.recharger, melhor)
+                return self.decidir(world, melhor if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger)
 
             if self.cargo == len(goals):
-                melhor = min(goals, key=lambda g: self.astar2(pos_atual, g, world))
-                dist = self.astar2(pos_atual, melhor, world)
-                dist_ret = self.astar2(melhor, world.recharger, world)
-                return melhor if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger
+                distancias = tabela.distancias(pos_atual, goals)
+                melhor = min(goals, key=lambda g: distancias.get(g, float('inf')))
+                dist = distancias.get(melhor, float('inf'))
+                dist_ret = tabela.distancia(world.recharger, melhor)
+                return self.decidir(world, melhor if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger)
 
             if self.cargo > 0 and packages:
-                melhor = min(pgs, key=lambda x: self.astar2(pos_atual, x, world))
-                dist = self.astar2(pos_atual, melhor, world)
-                dist_ret = self.astar2(melhor, world.recharger, world)
-                return melhor if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger
+                distancias = tabela.distancias(pos_atual, pgs)
+                melhor = min(pgs, key=lambda x: distancias.get(x, float('inf')))
+                dist = distancias.get(melhor, float('inf'))
+                dist_ret = tabela.distancia(world.recharger, melhor)
+                return self.decidir(world, melhor if self.pode_visitar_e_recarregar(dist, dist_ret) else world.recharger)
 
             return None
            
 class DijkstraPlayer(BasePlayer):
+    __slots__ = ()
 
     def dijkstra_multi_target(self, start, targets, world):
-        maze = world.map
-        size = world.maze_size
-        visited = set()
-        dist = {tuple(start): 0}
-        heap = [(0, tuple(start))]
-        targets_set = set(map(tuple, targets))
-
-        while heap:
-            current_dist, current = heapq.heappop(heap)
-            if current in visited:
-                continue
-            visited.add(current)
-
-            if current in targets_set:
-                return list(current), current_dist  # Alvo mais próximo encontrado
-
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                neighbor = (current[0] + dx, current[1] + dy)
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 0:
-                        new_cost = current_dist + 1
-                        if new_cost < dist.get(neighbor, float('inf')):
-                            dist[neighbor] = new_cost
-                            heapq.heappush(heap, (new_cost, neighbor))
-
-        return None, float('inf')  
+        return world.grid.dijkstra_multi_target(start, targets)  # Alvo mais próximo encontrado
 
     def dijkstra(self, start, goal, world):
-        return self.dijkstra_multi_target(start, [goal], world)[1]
+        return world.grid.distancia(start, goal)
 
     def escolher_alvo(self, world):
         pos_atual = self.position
         packages = world.packages
         goals = world.goals
-        pgs = packages + goals
-        custo_bateria = self.dijkstra(pos_atual, world.recharger, world)
+        pgs = world.indice_alvos  # pacotes e metas, sem montar uma lista nova
+        tabela = world.distancias
+        custo_bateria = tabela.distancia(world.recharger, pos_atual)
 
         if self.battery <= custo_bateria:
-            return world.recharger
+            return self.decidir(world, world.recharger)
         
 
         if self.cargo == 0 and packages:
-            alvo, dist = self.dijkstra_multi_target(pos_atual, packages, world)
-            dist_ret = self.dijkstra(alvo, world.recharger, world)
+            alvo, dist = tabela.mais_proximo(pos_atual, packages)
+            dist_ret = tabela.distancia(world.recharger, alvo)
             if self.pode_visitar_e_recarregar(dist, dist_ret):
-                return alvo
+                return self.decidir(world, alvo)
             else:
-                return world.recharger
+                return self.decidir(world, world.recharger)
 
         if self.cargo == len(goals):
-            alvo, dist = self.dijkstra_multi_target(pos_atual, goals, world)
-            dist_ret = self.dijkstra(alvo, world.recharger, world)
+            alvo, dist = tabela.mais_proximo(pos_atual, goals)
+            dist_ret = tabela.distancia(world.recharger, alvo)
             if self.pode_visitar_e_recarregar(dist, dist_ret):
-                return alvo
+                return self.decidir(world, alvo)
             else:
-                return world.recharger
+                return self.decidir(world, world.recharger)
 
         if self.cargo > 0 and packages:
-            alvo, dist = self.dijkstra_multi_target(pos_atual, pgs, world)
-            dist_ret = self.dijkstra(alvo, world.recharger, world)
+            alvo, dist = tabela.mais_proximo(pos_atual, pgs)
+            dist_ret = tabela.distancia(world.recharger, alvo)
             if self.pode_visitar_e_recarregar(dist, dist_ret):
-                return alvo
+                return self.decidir(world, alvo)
             else:
-                return world.recharger
+                return self.decidir(world, world.recharger)
 
         return None
 
 class HybridPlayer(BasePlayer):
+    __slots__ = ()
     def heuristic(self, a, b):
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
     def astar(self, start, goal, world):
-        maze = world.map
-        size = world.maze_size
-        neighbors = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        close_set = set()
-        gscore = {tuple(start): 0}
-        fscore = {tuple(start): self.heuristic(start, goal)}
-        oheap = []
-        heapq.heappush(oheap, (fscore[tuple(start)], tuple(start)))
-        
-        while oheap:
-            current = heapq.heappop(oheap)[1]
-            if list(current) == goal:
-                return gscore[current]  # Retorna custo total
-
-            close_set.add(current)
-            for dx, dy in neighbors:
-                neighbor = (current[0] + dx, current[1] + dy)
-                tentative_g = gscore[current] + 1
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 1:
-                        continue
-                else:
-                    continue
-                if neighbor in close_set and tentative_g >= gscore.get(neighbor, 0):
-                    continue
-                if tentative_g < gscore.get(neighbor, float('inf')) or neighbor not in [i[1] for i in oheap]:
-                    gscore[neighbor] = tentative_g
-                    fscore[neighbor] = tentative_g + self.heuristic(neighbor, goal)
-                    heapq.heappush(oheap, (fscore[neighbor], neighbor))
-        return float('inf')
+        return world.caminho(start, goal)[0]
 
     def dijkstra_multi_target(self, start, targets, world):
-        maze = world.map
-        size = world.maze_size
-        visited = set()
-        dist = {tuple(start): 0}
-        heap = [(0, tuple(start))]
-        targets_set = set(map(tuple, targets))
-
-        while heap:
-            current_dist, current = heapq.heappop(heap)
-            if current in visited:
-                continue
-            visited.add(current)
-
-            if current in targets_set:
-                return list(current), current_dist
-
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                neighbor = (current[0] + dx, current[1] + dy)
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 0:
-                        new_cost = current_dist + 1
-                        if new_cost < dist.get(neighbor, float('inf')):
-                            dist[neighbor] = new_cost
-                            heapq.heappush(heap, (new_cost, neighbor))
-        return None, float('inf')
+        return world.grid.dijkstra_multi_target(start, targets)
 
     def escolher_alvo(self, world):
         pos_atual = self.position
         packages = world.packages
         goals = world.goals
-        pgs = packages + goals
+        pgs = world.indice_alvos  # pacotes e metas, sem montar uma lista nova
 
-        custo_retorno = self.astar(pos_atual, world.recharger, world)
+        tabela = world.distancias
+        custo_retorno = tabela.distancia(world.recharger, pos_atual)
         if self.battery <= custo_retorno:
-            return world.recharger
+            return self.decidir(world, world.recharger)
         
 
         if self.cargo == 0 and packages:
-            alvo, dist = self.dijkstra_multi_target(pos_atual, packages, world)
-            dist_ret = self.astar(alvo, world.recharger, world)
+            alvo, dist = tabela.mais_proximo(pos_atual, packages)
+            dist_ret = tabela.distancia(world.recharger, alvo)
             if self.pode_visitar_e_recarregar(dist, dist_ret):
-                return alvo
+                return self.decidir(world, alvo)
             else:
-                return world.recharger
+                return self.decidir(world, world.recharger)
 
         if self.cargo == len(goals):
-            alvo, dist = self.dijkstra_multi_target(pos_atual, goals, world)
-            dist_ret = self.astar(alvo, world.recharger, world)
+            alvo, dist = tabela.mais_proximo(pos_atual, goals)
+            dist_ret = tabela.distancia(world.recharger, alvo)
             if self.pode_visitar_e_recarregar(dist, dist_ret):
-                return alvo
+                return self.decidir(world, alvo)
             else:
-                return world.recharger
+                return self.decidir(world, world.recharger)
 
         if self.cargo > 0 and packages:
-            alvo, dist = self.dijkstra_multi_target(pos_atual, pgs, world)
-            dist_ret = self.astar(alvo, world.recharger, world)
+            alvo, dist = tabela.mais_proximo(pos_atual, pgs)
+            dist_ret = tabela.distancia(world.recharger, alvo)
             if self.pode_visitar_e_recarregar(dist, dist_ret):
-                return alvo
+                return self.decidir(world, alvo)
             else:
-                return world.recharger
+                return self.decidir(world, world.recharger)
 
         return None
 
 class EnchacedPlayer(BasePlayer):
+    __slots__ = ()
 
     def escolher_alvo(self, world):
         sx, sy = self.position
         dist_ret = abs(world.recharger[0] - sx) + abs(world.recharger[1] - sy)
         # Se não estiver carregando pacote e houver pacotes disponíveis:
         if self.cargo == 0 and world.packages:
-            best = None
-            best_dist = float('inf')
-            for pkg in world.packages:
-                d = abs(pkg[0] - sx) + abs(pkg[1] - sy)
-                if d < best_dist:
-                    best_dist = d
-                    best = pkg
+            best, best_dist = world.indice_pacotes.mais_proximo(self.position)
             return best if self.pode_visitar_e_recarregar(best_dist, dist_ret) else world.recharger
         else:
             # Se estiver carregando ou não houver mais pacotes, vai para a meta de entrega (se existir)
             if world.goals:
-                best = None
-                best_dist = float('inf')
-                for goal in world.goals:
-                    d = abs(goal[0] - sx) + abs(goal[1] - sy)
-                    if d < best_dist:
-                        best_dist = d
-                        best = goal
+                best, best_dist = world.indice_metas.mais_proximo(self.position)
                 return best if self.pode_visitar_e_recarregar(best_dist, dist_ret) else world.recharger
             else:
                 return None
@@ -440,135 +344,637 @@ class DefaultPlayer(BasePlayer):
     Se não estiver carregando pacotes (cargo == 0), escolhe o pacote mais próximo.
     Caso contrário, escolhe a meta (entrega) mais próxima.
     """
+    __slots__ = ()
+
     def escolher_alvo(self, world):
-        sx, sy = self.position
+        # Mais próximo por Manhattan pelo índice espacial (empates: o primeiro da lista)
         # Se não estiver carregando pacote e houver pacotes disponíveis:
         if self.cargo == 0 and world.packages:
-            best = None
-            best_dist = float('inf')
-            for pkg in world.packages:
-                d = abs(pkg[0] - sx) + abs(pkg[1] - sy)
-                if d < best_dist:
-                    best_dist = d
-                    best = pkg
-            return best
+            return world.indice_pacotes.mais_proximo(self.position)[0]
         else:
             # Se estiver carregando ou não houver mais pacotes, vai para a meta de entrega (se existir)
             if world.goals:
-                best = None
-                best_dist = float('inf')
-                for goal in world.goals:
-                    d = abs(goal[0] - sx) + abs(goal[1] - sy)
-                    if d < best_dist:
-                        best_dist = d
-                        best = goal
-                return best
+                return world.indice_metas.mais_proximo(self.position)[0]
             else:
                 return None
 
+class TourPlayer(BasePlayer):
+    """
+    Planeja de uma vez o roteiro inteiro (quais pacotes coletar, a ordem de coletas e entregas
+    e onde passar pelo recarregador) sobre a matriz de distâncias entre os pontos de interesse,
+    e depois só segue as paradas. Veja rotas.planejar_rota.
+
+    O plano é refeito apenas quando diverge do mundo: outro mapa, grid alterado (versao),
+    parada que não existe mais ou entrega sem pacote na carga. O perfil de bateria não é usado:
+    as recargas já são escolhidas pelo custo real da bateria.
+    """
+    __slots__ = ("plano", "planejamentos", "_mapa_plano", "_versao_plano")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.plano = []
+        self.planejamentos = 0
+        self._mapa_plano = None
+        self._versao_plano = None
+
+    def planejar(self, world):
+        inicio = self.position
+        todos = [inicio] + list(world.packages) + list(world.goals) + [world.recharger]
+        # D[a][b]: distância do ponto a ao ponto b; com muitos pontos a tabela monta a matriz
+        # sem guardar um campo por ponto (veja TabelaDistancias.matriz)
+        D = world.distancias.matriz(inicio, todos[1:])
+        n_pacotes = len(world.packages)
+        alcancaveis = [i for i in range(1, len(todos) - 1) if D[0][i] < float('inf')]
+        pacotes = [i for i in alcancaveis if i <= n_pacotes]
+        metas = [i for i in alcancaveis if i > n_pacotes]
+        indices = [0] + pacotes + metas + [len(todos) - 1]
+        pontos = [todos[i] for i in indices]
+        D = [[D[a][b] for b in indices] for a in indices]
+        n = len(pontos)
+        p, g = len(pacotes), len(metas)
+        _, rota = rotas.planejar_rota(D, range(1, p + 1), range(p + 1, p + g + 1), n - 1,
+                                      carga=self.cargo, bateria=self.battery)
+        plano = []
+        anterior = inicio
+        for i in rota:
+            if pontos[i] != anterior:  # recarga no próprio lugar não gera passo
+                plano.append(pontos[i])
+            anterior = pontos[i]
+        self.plano = plano
+        self.planejamentos += 1
+        # O mapa identifica o mundo do plano: clones de um World o compartilham (e o plano
+        # continua valendo neles) até que um dos dois altere o grid
+        self._mapa_plano = world.map
+        self._versao_plano = world.versao
+
+    def plano_valido(self, world):
+        if self._mapa_plano is not world.map or self._versao_plano != world.versao:
+            return False
+        carga = self.cargo
+        metas = 0
+        for parada in self.plano:
+            if parada in world.goals:
+                if carga <= 0:
+                    return False
+                carga -= 1
+                metas += 1
+            elif parada in world.packages:
+                carga += 1
+            elif parada != world.recharger:
+                return False
+        return metas == len(world.goals) or not self.plano
+
+    def estado(self):
+        return super().estado() + (tuple(self.plano), self._mapa_plano, self._versao_plano)
+
+    def restaurar_estado(self, estado):
+        super().restaurar_estado(estado)
+        plano, self._mapa_plano, self._versao_plano = estado[3:]
+        self.plano = list(plano)
+
+    def escolher_alvo(self, world):
+        # Parada alcançada: a coleta/entrega já foi feita pelo Maze
+        if self.plano and self.position == self.plano[0]:
+            self.plano.pop(0)
+        if not self.plano_valido(world):
+            self.planejar(world)
+        if not self.plano:
+            return None
+        return self.decidir(world, self.plano[0])
+
+class BatteryPlayer(BasePlayer):
+    """
+    Escolhe o alvo e o caminho juntos com a busca no espaço (célula, bateria) de
+    Grid.busca_com_bateria: o caminho já traz o desvio pelo recarregador quando ele compensa,
+    em vez de checar a bateria depois, por perfil (o perfil de bateria não é usado).
+
+    A carga define os alvos válidos: sem carga, os pacotes; com carga para todas as metas
+    restantes, as metas; senão, ambos. Cada alvo recebe como penalidade o excesso de custo da
+    volta ao recarregador com a bateria que sobra (zero na última entrega, que encerra o jogo).
+    """
+    __slots__ = ()
+    passo_bateria = 1  # largura das faixas de bateria da dominância
+
+    def escolher_alvo(self, world):
+        packages = world.packages
+        goals = world.goals
+        if self.cargo == 0:
+            alvos = packages
+        elif self.cargo >= len(goals):
+            alvos = goals
+        else:
+            alvos = world.indice_alvos
+        if not alvos:
+            return None
+
+        tabela = world.distancias
+        recharger = world.recharger
+        ultima_entrega = self.cargo > 0 and len(goals) == 1
+
+        def penalidade(alvo, bateria):
+            if ultima_entrega and alvo in goals:
+                return 0
+            volta = tabela.distancia(recharger, alvo)
+            if volta == float('inf'):
+                return 0
+            return rotas.custo_trecho(volta, bateria) - volta
+
+        custo, caminho, alvo = world.grid.busca_com_bateria(
+            self.position, self.battery, alvos, recharger, passo_bateria=self.passo_bateria,
+            penalidade=penalidade)
+        if alvo is None:
+            return None
+        return Decisao(alvo, caminho, custo)
+
+class PoliticaRollout(DijkstraPlayer):
+    """
+    Política padrão dos rollouts do RolloutPlayer: a do DijkstraPlayer, com o primeiro alvo
+    imposto (o candidato avaliado) e, com probabilidade `aleatoriedade`, um dos três alvos
+    válidos mais próximos (Manhattan) sorteado no lugar da escolha gulosa.
+    """
+    __slots__ = ("primeiro_alvo", "rng", "aleatoriedade")
+
+    def __init__(self, *args, primeiro_alvo=None, semente=None, aleatoriedade=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primeiro_alvo = primeiro_alvo
+        self.rng = random.Random(semente)
+        self.aleatoriedade = aleatoriedade
+
+    def escolher_alvo(self, world):
+        if self.primeiro_alvo is not None:
+            alvo, self.primeiro_alvo = self.primeiro_alvo, None
+            return self.decidir(world, alvo)
+        if self.aleatoriedade and self.rng.random() < self.aleatoriedade:
+            if self.cargo == 0:
+                indice = world.indice_pacotes
+            elif self.cargo >= len(world.goals):
+                indice = world.indice_metas
+            else:
+                indice = world.indice_alvos
+            proximos = indice.mais_proximos(self.position, 3)
+            if proximos:
+                return self.decidir(world, self.rng.choice(proximos)[0])
+        return super().escolher_alvo(world)
+
+class RolloutPlayer(DijkstraPlayer):
+    """
+    Lookahead por Monte Carlo: os alvos candidatos (os mais próximos entre os válidos para a
+    carga, mais o recarregador) são avaliados simulando o resto do episódio em clones headless
+    do mundo com a PoliticaRollout, e o alvo com a maior pontuação média é escolhido.
+
+    Os rollouts rodam em um pool de processos (`executor`), em que cada worker gera o World uma
+    vez a partir da seed e o reaproveita. O pool de threads é só a alternativa para quando não
+    há como gerar o mundo de novo (sem seed ou com o grid alterado) ou quando o episódio já
+    roda em um worker de uma varredura paralela: os rollouts são Python puro, e com o GIL as
+    threads rodam um de cada vez, sem ganho de velocidade.
+
+    Por padrão cada decisão faz exatamente `rollouts` por candidato, e o resultado é
+    determinístico (cada rollout tem a própria semente), como nas varreduras. Com `orcamento`
+    (segundos por decisão, --orcamento-rollout) os rollouts que não terminam no prazo são
+    interrompidos e descartados, trocando qualidade da estimativa por latência; a decisão passa
+    a depender da velocidade da máquina. Sem nenhum rollout concluído, decide como o
+    DijkstraPlayer.
+    """
+    __slots__ = ("rollouts_feitos",)
+    candidatos = 4        # alvos avaliados por decisão (fora o recarregador)
+    rollouts = 8          # rollouts por candidato
+    lote = 4              # rollouts por tarefa enviada ao pool
+    aleatoriedade = 0.1   # probabilidade de escolha sorteada na política dos rollouts
+    orcamento = None      # segundos por decisão (None: sem prazo, todos os rollouts)
+    workers = min(4, os.cpu_count() or 1)
+    executor = "processos"  # "processos" ou "threads"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rollouts_feitos = 0
+
+    def candidatos_rollout(self, world):
+        if self.cargo == 0:
+            alvos = world.packages
+        elif self.cargo >= len(world.goals):
+            alvos = world.goals
+        else:
+            alvos = world.indice_alvos
+        distancias = world.distancias.distancias(self.position, alvos)
+        candidatos = sorted((d, p) for p, d in distancias.items() if d > 0)[:self.candidatos]
+        candidatos = [p for _, p in candidatos]
+        if world.recharger != self.position and world.distancias.distancia(world.recharger, self.position) < float('inf'):
+            candidatos.append(world.recharger)
+        return candidatos
+
+    def avaliar(self, world, candidatos):
+        """{candidato: pontuação média dos rollouts concluídos no orçamento}."""
+        prazo = None if self.orcamento is None else time.monotonic() + self.orcamento
+        # Dentro de um worker de rodar_varredura os núcleos já estão ocupados pela varredura
+        processos = (self.executor == "processos" and world.seed is not None and world.versao == 0
+                     and multiprocessing.parent_process() is None)
+        pool = _executor_rollouts("processos" if processos else "threads", self.workers)
+        if processos:
+            config = (world.seed, world.maze_size, world.total_items, world.num_pacotes, world.densidade)
+            estado = (self.estado(), self.perfil_bateria, self.margem_bateria, tuple(world.packages), tuple(world.goals))
+        base = f"{world.seed}:{self.position}:{self.cargo}:{self.battery}:{len(world.packages)}:{len(world.goals)}"
+        futuros = {}
+        # Em rodadas de `lote` rollouts por tarefa (menos idas e voltas ao pool): todo candidato
+        # recebe uma rodada antes de qualquer um receber a seguinte
+        for inicio in range(0, self.rollouts, self.lote):
+            indices = range(inicio, min(inicio + self.lote, self.rollouts))
+            for candidato in candidatos:
+                sementes = [f"{base}:{candidato}:{i}" for i in indices]
+                if processos:
+                    futuro = pool.submit(_rollouts_em_processo, config, estado, candidato, sementes,
+                                         self.aleatoriedade, prazo)
+                else:
+                    futuro = pool.submit(_rollouts_em_thread, world, candidato, sementes, self.aleatoriedade, prazo)
+                futuros[futuro] = candidato
+        feitos, pendentes = wait(futuros, timeout=None if prazo is None else max(0.0, prazo - time.monotonic()))
+        for futuro in pendentes:
+            futuro.cancel()
+        # Os que já começaram param na próxima decisão; espera por eles para que nenhum clone
+        # seja feito enquanto o Maze altera o mundo
+        wait(pendentes)
+        somas = {}
+        for futuro in feitos:
+            for pontos in futuro.result():
+                if pontos is not None:
+                    soma, n = somas.get(futuros[futuro], (0, 0))
+                    somas[futuros[futuro]] = (soma + pontos, n + 1)
+        self.rollouts_feitos += sum(n for _, n in somas.values())
+        return {candidato: soma / n for candidato, (soma, n) in somas.items()}
+
+    def escolher_alvo(self, world):
+        candidatos = self.candidatos_rollout(world)
+        if len(candidatos) == 1:
+            return self.decidir(world, candidatos[0])
+        medias = self.avaliar(world, candidatos) if candidatos else {}
+        if not medias:
+            return super().escolher_alvo(world)
+        # max fica com o primeiro dos empatados: o candidato mais próximo
+        alvo = max((c for c in candidatos if c in medias), key=medias.get)
+        return self.decidir(world, alvo)
+
+# Pools dos rollouts, criados no primeiro uso e compartilhados por todos os RolloutPlayers
+_EXECUTORES_ROLLOUT = {}
+
+# Mundos gerados pelos workers do pool de processos, por (seed, maze_size, total_items, num_pacotes, densidade)
+_MUNDOS_ROLLOUT = {}
+
+# Grid e cache de caminhos de cada thread do pool, reaproveitados entre os rollouts do mesmo grid
+_AREA_ROLLOUT = threading.local()
+
+def _executor_rollouts(tipo, workers):
+    executor = _EXECUTORES_ROLLOUT.get((tipo, workers))
+    if executor is None:
+        classe = ProcessPoolExecutor if tipo == "processos" else ThreadPoolExecutor
+        executor = _EXECUTORES_ROLLOUT[(tipo, workers)] = classe(max_workers=workers)
+    return executor
+
+def _rollout(world, candidato, semente, aleatoriedade, prazo):
+    """
+    Simula o resto do episódio em world (um clone, que é alterado) indo primeiro a candidato.
+    Retorna a pontuação obtida a partir do estado atual, ou None se o prazo (None: sem prazo)
+    acabou antes do fim.
+    """
+    jogador = world.player
+    politica = PoliticaRollout(jogador.position, jogador.perfil_bateria, jogador.margem_bateria,
+                               primeiro_alvo=candidato, semente=semente, aleatoriedade=aleatoriedade)
+    politica.cargo = jogador.cargo
+    politica.battery = jogador.battery
+    world.player = politica
+    maze = Maze(world=world, headless=True, verbose=False, por_segmento=True)
+    estourou = []
+
+    def checar_prazo(maze, registro):
+        if time.monotonic() > prazo:
+            estourou.append(True)
+            maze.running = False
+
+    if prazo is not None:
+        maze.ganchos_decisao.append(checar_prazo)
+    maze.simular(salvar=False)
+    return None if estourou else maze.score
+
+def _rollouts_em_thread(world, candidato, sementes, aleatoriedade, prazo):
+    """Um rollout por semente (veja _rollout); None nos que não couberam no prazo."""
+    # Como clonar(isolado=True), mas com a área de busca e o cache da thread: os caminhos
+    # calculados em um rollout servem aos seguintes
+    area = getattr(_AREA_ROLLOUT, "area", None)
+    if area is None or area[0] is not world.grid:
+        area = _AREA_ROLLOUT.area = (world.grid, world.grid.copia(),
+                                     pathfinding.CacheCaminhos(world.cache_caminhos.tamanho_maximo))
+    pontos = []
+    for semente in sementes:
+        if prazo is not None and time.monotonic() > prazo:
+            pontos.append(None)
+            continue
+        clone = world.clonar()
+        clone.grid = clone.distancias.grid = area[1]
+        clone.cache_caminhos = area[2]
+        pontos.append(_rollout(clone, candidato, semente, aleatoriedade, prazo))
+    return pontos
+
+def _rollouts_em_processo(config, estado, candidato, sementes, aleatoriedade, prazo):
+    """Como _rollouts_em_thread, sobre o mundo gerado (uma vez por worker) a partir de config."""
+    world = _MUNDOS_ROLLOUT.get(config)
+    if world is None:
+        if len(_MUNDOS_ROLLOUT) >= 4:
+            _MUNDOS_ROLLOUT.pop(next(iter(_MUNDOS_ROLLOUT)))
+        seed, maze_size, total_items, num_pacotes, densidade = config
+        world = _MUNDOS_ROLLOUT[config] = World(seed, PoliticaRollout, headless=True, maze_size=maze_size,
+                                                total_items=total_items, num_pacotes=num_pacotes, densidade=densidade)
+    jogador, perfil_bateria, margem_bateria, pacotes, metas = estado
+    base = world.clonar()
+    base.player = PoliticaRollout(jogador[0], perfil_bateria, margem_bateria)
+    base.player.restaurar_estado(jogador)
+    base.packages = ColecaoPontos(base.grid.W, pacotes)
+    base.goals = ColecaoPontos(base.grid.W, metas)
+    base.indice_pacotes = espacial.IndiceEspacial(pacotes)
+    base.indice_metas = espacial.IndiceEspacial(metas)
+    base.indice_alvos = espacial.IndiceEspacial(pacotes + metas)
+    pontos = []
+    for semente in sementes:
+        if prazo is not None and time.monotonic() > prazo:
+            pontos.append(None)
+            continue
+        pontos.append(_rollout(base.clonar(), candidato, semente, aleatoriedade, prazo))
+    return pontos
+
 # ==========================
 # CLASSE WORLD (MUNDO)
 # ==========================
+class ColecaoPontos:
+    """
+    Pacotes ou metas do World: posições indexadas pelo id da célula (o mesmo do Grid), na ordem
+    de inserção. Pertinência e remoção são O(1) e a iteração segue a ordem original, então os
+    desempates das estratégias continuam os mesmos da lista.
+
+    Para as estratégias é uma visão só de leitura, usada como a lista antiga: iteração, len,
+    `in` e `+` (que devolve uma lista nova). Só o World altera o conteúdo, por coletar/entregar.
+    """
+    __slots__ = ("_largura", "_pontos")
+
+    def __init__(self, largura, pontos=()):
+        self._largura = largura  # W do Grid: lado do mapa + 2
+        self._pontos = {}
+        for ponto in pontos:
+            self._pontos[self._id(ponto)] = ponto
+
+    def _id(self, pos):
+        return (pos[0] + 1) * self._largura + (pos[1] + 1)
+
+    def _remover(self, pos):
+        if self._pontos.pop(self._id(pos), None) is None:
+            raise ValueError(f"{pos} não está na coleção")
+
+    def __len__(self):
+        return len(self._pontos)
+
+    def __iter__(self):
+        return iter(self._pontos.values())
+
+    def __contains__(self, pos):
+        ponto = self._pontos.get(self._id(pos))
+        return ponto is not None and ponto[0] == pos[0] and ponto[1] == pos[1]
+
+    def copiar(self):
+        copia = ColecaoPontos(self._largura)
+        copia._pontos = dict(self._pontos)
+        return copia
+
+    def __add__(self, outra):
+        return list(self) + list(outra)
+
+    def __radd__(self, outra):
+        return list(outra) + list(self)
+
+    def __repr__(self):
+        return f"ColecaoPontos({list(self)!r})"
+
 class World:
-    def __init__(self, seed=None, player_class=None): 
-        if seed is not None:
-            random.seed(seed)
+    def __init__(self, seed=None, player_class=None, headless=False,
+                 maze_size=50, total_items=6, num_pacotes=None, densidade=1.0, tamanho_cache=4096,
+                 perfil_bateria="aventureiro", margem_bateria=None):
+        """
+        maze_size: lado do grid (mínimo 12).
+        total_items: número de entregas (metas); num_pacotes: locais de coleta (padrão: 2 * total_items).
+        densidade: multiplicador de obstáculos; com 1.0 um grid 50x50 tem 7 barragens horizontais,
+        7 verticais e 1 bloco, e grids maiores recebem a mesma quantidade por área.
+        tamanho_cache: número máximo de caminhos guardados no cache LRU de A*.
+        perfil_bateria, margem_bateria: repassados ao player (veja PERFIS_BATERIA).
+        """
+        if maze_size < 12:
+            raise ValueError("maze_size deve ser pelo menos 12")
+        # Gerador próprio do mundo: cada episódio é determinístico pela seed,
+        # sem depender do estado global do módulo random (seguro em processos paralelos).
+        self.rng = random.Random(seed)
         self.seed = seed
-        self.maze_size = 50
-        self.width = 600
-        self.height = 600
-        self.block_size = self.width // self.maze_size
-        self.map = [[0 for _ in range(self.maze_size)] for _ in range(self.maze_size)]
+        self.maze_size = maze_size
+        self.densidade = densidade
+        self.perfil_bateria = perfil_bateria
+        self.margem_bateria = margem_bateria
+        self.map = [[0] * self.maze_size for _ in range(self.maze_size)]
         self.generate_obstacles()
-        self.walls = [(col, row) for row in range(self.maze_size) for col in range(self.maze_size) if self.map[row][col] == 1]
-        self.total_items = 6
-
-        self.packages = []
-        while len(self.packages) < self.total_items * 2:
-            x = random.randint(0, self.maze_size - 1)
-            y = random.randint(0, self.maze_size - 1)
-            if self.map[y][x] == 0 and [x, y] not in self.packages:
-                self.packages.append([x, y])
-
-        self.goals = []
-        while len(self.goals) < self.total_items:
-            x = random.randint(0, self.maze_size - 1)
-            y = random.randint(0, self.maze_size - 1)
-            if self.map[y][x] == 0 and [x, y] not in self.goals and [x, y] not in self.packages:
-                self.goals.append([x, y])
+        self.versao = 0  # incrementada a cada alteração do grid
+        self._mapa_compartilhado = False  # map também usado por um clone (veja clonar)
+        self.grid = pathfinding.Grid(self.map)  # representação plana usada pelas buscas
+        self.distancias = pathfinding.TabelaDistancias(self.grid)  # distâncias a partir de cada ponto de interesse
+        self.cache_caminhos = pathfinding.CacheCaminhos(tamanho_cache)  # caminhos A* compartilhados por Maze e players
+        self.total_items = total_items
+        if num_pacotes is None:
+            num_pacotes = self.total_items * 2
+        self.num_pacotes = num_pacotes
+
+        # Células já usadas por pacotes/metas: checagem O(1) em vez de varrer as listas
+        self.ocupadas = set()
+        self.packages = ColecaoPontos(self.grid.W, self.sortear_posicoes(num_pacotes, reservar=2))
+        self.goals = ColecaoPontos(self.grid.W, self.sortear_posicoes(self.total_items, reservar=2))
+        # Índices espaciais (mais próximos por Manhattan e contagem de cluster), mantidos por
+        # coletar/entregar: pacotes, metas e os dois juntos (na ordem packages + goals)
+        self.indice_pacotes = espacial.IndiceEspacial(self.packages)
+        self.indice_metas = espacial.IndiceEspacial(self.goals)
+        self.indice_alvos = espacial.IndiceEspacial(self.packages + self.goals)
 
         # Usa player_class passado na construção
         self.player = self.generate_player(player_class) 
         self.recharger = self.generate_recharger()
 
-        pygame.init()
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("Delivery Bot")
-
-        self.package_image = pygame.image.load("images/cargo.png")
-        self.package_image = pygame.transform.scale(self.package_image, (self.block_size, self.block_size))
-
-        self.goal_image = pygame.image.load("images/operator.png")
-        self.goal_image = pygame.transform.scale(self.goal_image, (self.block_size, self.block_size))
-
-        self.recharger_image = pygame.image.load("images/charging-station.png")
-        self.recharger_image = pygame.transform.scale(self.recharger_image, (self.block_size, self.block_size))
+        # A renderização é um observador opcional: no modo headless o World nunca toca no pygame.
+        self.renderer = None if headless else Renderer(self)
 
-        self.wall_color = (100, 100, 100)
-        self.ground_color = (255, 255, 255)
-        self.player_color = (0, 255, 0)
-        self.path_color = (200, 200, 0)
+    def sortear_posicoes(self, quantidade, reservar=0):
+        """
+        Sorteia `quantidade` células livres e ainda não ocupadas.
+        Enquanto houver folga usa amostragem por rejeição (mesma sequência de sorteios das versões
+        anteriores, então as seeds antigas geram os mesmos mundos); quando os itens ocupariam mais
+        da metade das células disponíveis, sorteia direto do índice de células livres.
+        reservar: células que precisam sobrar para o que ainda será posicionado depois
+        (o player e o recarregador).
+        """
+        livres = sum(row.count(0) for row in self.map) - len(self.ocupadas)
+        if quantidade + reservar > livres:
+            raise ValueError(f"Não há células livres suficientes para {quantidade} itens")
+
+        posicoes = []
+        if quantidade * 2 > livres:
+            candidatas = [(x, y) for y, row in enumerate(self.map) for x, v in enumerate(row)
+                          if v == 0 and (x, y) not in self.ocupadas]
+            for x, y in self.rng.sample(candidatas, quantidade):
+                self.ocupadas.add((x, y))
+                posicoes.append((x, y))
+            return posicoes
+
+        while len(posicoes) < quantidade:
+            x = self.rng.randint(0, self.maze_size - 1)
+            y = self.rng.randint(0, self.maze_size - 1)
+            if self.map[y][x] == 0 and (x, y) not in self.ocupadas:
+                self.ocupadas.add((x, y))
+                posicoes.append((x, y))
+        return posicoes
 
     def generate_obstacles(self):
         """
         Gera obstáculos com sensação de linha de montagem:
          - Cria vários segmentos horizontais curtos com lacunas.
          - Cria vários segmentos verticais curtos com lacunas.
-         - Cria um obstáculo em bloco grande (4x4 ou 6x6) simulando uma estrutura de suporte.
+         - Cria obstáculos em bloco grande (4x4 ou 6x6) simulando estruturas de suporte.
+        A quantidade de cada tipo escala com a área do grid e com self.densidade.
         """
+        escala = self.densidade * (self.maze_size / 50) ** 2
+        num_barragens = round(7 * escala)
+
         # Barragens horizontais curtas:
-        for _ in range(7):
-            row = random.randint(5, self.maze_size - 6)
-            start = random.randint(0, self.maze_size - 10)
-            length = random.randint(5, 10)
+        for _ in range(num_barragens):
+            row = self.rng.randint(5, self.maze_size - 6)
+            start = self.rng.randint(0, self.maze_size - 10)
+            length = self.rng.randint(5, 10)
             for col in range(start, start + length):
-                if random.random() < 0.7:
+                if self.rng.random() < 0.7:
                     self.map[row][col] = 1
 
         # Barragens verticais curtas:
-        for _ in range(7):
-            col = random.randint(5, self.maze_size - 6)
-            start = random.randint(0, self.maze_size - 10)
-            length = random.randint(5, 10)
+        for _ in range(num_barragens):
+            col = self.rng.randint(5, self.maze_size - 6)
+            start = self.rng.randint(0, self.maze_size - 10)
+            length = self.rng.randint(5, 10)
             for row in range(start, start + length):
-                if random.random() < 0.7:
+                if self.rng.random() < 0.7:
                     self.map[row][col] = 1
 
-        # Obstáculo em bloco grande: bloco de tamanho 4x4 ou 6x6.
-        block_size = random.choice([4, 6])
-        max_row = self.maze_size - block_size
-        max_col = self.maze_size - block_size
-        top_row = random.randint(0, max_row)
-        top_col = random.randint(0, max_col)
-        for r in range(top_row, top_row + block_size):
-            for c in range(top_col, top_col + block_size):
-                self.map[r][c] = 1
-
-    def generate_player(self, player_class):  
-        while True:
-            x = random.randint(0, self.maze_size - 1)
-            y = random.randint(0, self.maze_size - 1)
-            if self.map[y][x] == 0 and [x, y] not in self.packages and [x, y] not in self.goals:
-                return player_class([x, y])  
+        # Obstáculos em bloco grande: blocos de tamanho 4x4 ou 6x6.
+        for _ in range(round(escala)):
+            block_size = self.rng.choice([4, 6])
+            max_row = self.maze_size - block_size
+            max_col = self.maze_size - block_size
+            top_row = self.rng.randint(0, max_row)
+            top_col = self.rng.randint(0, max_col)
+            for r in range(top_row, top_row + block_size):
+                self.map[r][top_col:top_col + block_size] = [1] * block_size
+
+    def generate_player(self, player_class):
+        # Mesmos sorteios do laço de rejeição de sempre enquanto houver folga; em mapas quase
+        # cheios sorteia da lista de células livres (ValueError se não sobrar nenhuma)
+        (x, y), = self.sortear_posicoes(1, reservar=1)
+        return player_class((x, y), self.perfil_bateria, self.margem_bateria)
 
     def generate_recharger(self):
-        # Coloca o recharger próximo ao centro
+        # Coloca o recharger próximo ao centro: sorteado no 3x3 central quando há célula livre
+        # nele, senão na célula livre mais próxima do centro (anéis de distância de Manhattan)
         center = self.maze_size // 2
-        while True:
-            x = random.randint(center - 1, center + 1)
-            y = random.randint(center - 1, center + 1)
-            if self.map[y][x] == 0 and [x, y] not in self.packages and [x, y] not in self.goals and [x, y] != self.player.position:
-                return [x, y]
+
+        def disponivel(x, y):
+            return self.map[y][x] == 0 and (x, y) not in self.ocupadas and (x, y) != self.player.position
+
+        if any(disponivel(x, y) for x in range(center - 1, center + 2) for y in range(center - 1, center + 2)):
+            while True:
+                x = self.rng.randint(center - 1, center + 1)
+                y = self.rng.randint(center - 1, center + 1)
+                if disponivel(x, y):
+                    return (x, y)
+        for raio in range(2, 2 * self.maze_size):
+            for dx in range(-raio, raio + 1):
+                x = center + dx
+                if not 0 <= x < self.maze_size:
+                    continue
+                resto = raio - abs(dx)
+                for y in sorted({center - resto, center + resto}):
+                    if 0 <= y < self.maze_size and disponivel(x, y):
+                        return (x, y)
+        raise ValueError("Não há célula livre para o recarregador")
+
+    def coletar(self, pos):
+        """Remove o pacote em pos do mundo, dos índices espaciais e da tabela de distâncias."""
+        self.packages._remover(pos)
+        self.indice_pacotes.remover(pos)
+        self.indice_alvos.remover(pos)
+        self.distancias.descartar(pos)
+
+    def entregar(self, pos):
+        """Remove a meta em pos do mundo, dos índices espaciais e da tabela de distâncias."""
+        self.goals._remover(pos)
+        self.indice_metas.remover(pos)
+        self.indice_alvos.remover(pos)
+        self.distancias.descartar(pos)
+
+    def caminho(self, start, goal):
+        """
+        (custo, caminho) de start até goal pelo A*, passando pelo cache LRU do mundo.
+        Maze e players consultam por aqui, então o mesmo par início/destino só é buscado uma vez
+        enquanto o grid não mudar. O caminho é a própria tupla de posições (x, y) guardada no
+        cache: imutável, então não precisa de cópia.
+        """
+        chave = (self.versao, start[0], start[1], goal[0], goal[1])
+        item = self.cache_caminhos.obter(chave)
+        if item is None:
+            custo, caminho = self.grid.astar(start, goal)
+            item = (custo, tuple(caminho))
+            self.cache_caminhos.guardar(chave, item)
+        return item
+
+    def alterar_celula(self, pos, valor):
+        """
+        Marca a célula pos como obstáculo (1) ou livre (0) e invalida tudo o que dependia do
+        grid antigo: representação plana, tabela de distâncias e caminhos em cache.
+        """
+        x, y = pos
+        if self.map[y][x] == valor:
+            return
+        if self._mapa_compartilhado:
+            # Cópia na escrita: o clone (ou o original) continua com o mapa e o cache antigos
+            self.map = [linha[:] for linha in self.map]
+            self.cache_caminhos = pathfinding.CacheCaminhos(self.cache_caminhos.tamanho_maximo)
+            self._mapa_compartilhado = False
+        self.map[y][x] = valor
+        self.versao += 1
+        self.grid = pathfinding.Grid(self.map)
+        self.distancias = pathfinding.TabelaDistancias(self.grid)
+        self.cache_caminhos.limpar()
+
+    def clonar(self, isolado=False):
+        """
+        Cópia do mundo para simular a partir do estado atual sem gerá-lo de novo. Mapa, grid,
+        campos de distância, cache de caminhos e recarregador são compartilhados (o mapa é
+        copiado só se um dos dois chamar alterar_celula, e só o original descarta campos);
+        pacotes, metas, índices, player e rng são copiados. O clone nunca renderiza.
+
+        isolado=True dá ao clone áreas de busca e cache de caminhos próprios, para que ele rode
+        em outra thread ao mesmo tempo que o original.
+        """
+        clone = World.__new__(World)
+        clone.__dict__.update(self.__dict__)
+        clone.rng = random.Random()
+        clone.rng.setstate(self.rng.getstate())
+        clone.packages = self.packages.copiar()
+        clone.goals = self.goals.copiar()
+        clone.indice_pacotes = self.indice_pacotes.copiar()
+        clone.indice_metas = self.indice_metas.copiar()
+        clone.indice_alvos = self.indice_alvos.copiar()
+        clone.player = self.player.copiar()
+        clone.renderer = None
+        if isolado:
+            clone.grid = self.grid.copia()
+            clone.cache_caminhos = pathfinding.CacheCaminhos(self.cache_caminhos.tamanho_maximo)
+        clone.distancias = self.distancias.copia(clone.grid)
+        self._mapa_compartilhado = clone._mapa_compartilhado = True
+        return clone
 
     def can_move_to(self, pos):
         x, y = pos
@@ -577,92 +983,306 @@ class World:
         return False
 
     def draw_world(self, path=None):
-        self.screen.fill(self.ground_color)
+        if self.renderer is not None:
+            self.renderer.draw(path)
+
+# ==========================
+# RENDERIZAÇÃO (pygame)
+# ==========================
+class Renderer:
+    """
+    Desenha o World com pygame.
+    Funciona como um observador opcional: o Maze só o chama quando a execução é visual.
+    """
+    def __init__(self, world):
+        if pygame is None:
+            raise RuntimeError("pygame não está instalado; use --headless para rodar sem interface gráfica")
+        self.world = world
+        self.block_size = max(1, 600 // world.maze_size)
+        self.width = self.height = self.block_size * world.maze_size
+
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.width, self.height))
+        pygame.display.set_caption("Delivery Bot")
+
+        self.package_image = pygame.image.load("images/cargo.png")
+        self.package_image = pygame.transform.scale(self.package_image, (self.block_size, self.block_size))
+
+        self.goal_image = pygame.image.load("images/operator.png")
+        self.goal_image = pygame.transform.scale(self.goal_image, (self.block_size, self.block_size))
+
+        self.recharger_image = pygame.image.load("images/charging-station.png")
+        self.recharger_image = pygame.transform.scale(self.recharger_image, (self.block_size, self.block_size))
+
+        self.wall_color = (100, 100, 100)
+        self.ground_color = (255, 255, 255)
+        self.player_color = (0, 255, 0)
+        self.path_color = (200, 200, 0)
+
+        self.atualizar_paredes()
+
+    def atualizar_paredes(self):
+        """
+        Pré-renderiza a camada estática (chão, paredes e recarregador) em uma superfície
+        guardada, usada para apagar qualquer célula com um único blit.
+        """
+        world = self.world
+        self.walls = [(col, row) for row in range(world.maze_size) for col in range(world.maze_size) if world.map[row][col] == 1]
+        self.versao = world.versao
+        self.fundo = pygame.Surface((self.width, self.height)).convert()
+        self.fundo.fill(self.ground_color)
         # Desenha os obstáculos (paredes)
         for (x, y) in self.walls:
-            rect = pygame.Rect(x * self.block_size, y * self.block_size, self.block_size, self.block_size)
-            pygame.draw.rect(self.screen, self.wall_color, rect)
-        # Desenha os locais de coleta (pacotes) utilizando a imagem
-        for pkg in self.packages:
-            x, y = pkg
-            self.screen.blit(self.package_image, (x * self.block_size, y * self.block_size))
-        # Desenha os locais de entrega (metas) utilizando a imagem
-        for goal in self.goals:
-            x, y = goal
-            self.screen.blit(self.goal_image, (x * self.block_size, y * self.block_size))
+            pygame.draw.rect(self.fundo, self.wall_color, self.rect_celula((x, y)))
         # Desenha o recharger utilizando a imagem
-        if self.recharger:
-            x, y = self.recharger
-            self.screen.blit(self.recharger_image, (x * self.block_size, y * self.block_size))
-        # Desenha o caminho, se fornecido
-        if path:
-            for pos in path:
-                x, y = pos
-                rect = pygame.Rect(x * self.block_size + self.block_size // 4,
-                                   y * self.block_size + self.block_size // 4,
-                                   self.block_size // 2, self.block_size // 2)
-                pygame.draw.rect(self.screen, self.path_color, rect)
-        # Desenha o jogador (retângulo colorido)
-        x, y = self.player.position
-        rect = pygame.Rect(x * self.block_size, y * self.block_size, self.block_size, self.block_size)
-        pygame.draw.rect(self.screen, self.player_color, rect)
-        pygame.display.flip()
+        if world.recharger:
+            x, y = world.recharger
+            self.fundo.blit(self.recharger_image, (x * self.block_size, y * self.block_size))
+        self.desenhado = False  # força um quadro completo
+
+    def rect_celula(self, pos):
+        return pygame.Rect(pos[0] * self.block_size, pos[1] * self.block_size, self.block_size, self.block_size)
+
+    def desenhar_celula(self, pos):
+        """Redesenha uma célula: fundo estático, pacote/meta, marca de caminho e jogador."""
+        rect = self.rect_celula(pos)
+        self.screen.blit(self.fundo, rect, rect)
+        if pos in self.pacotes:
+            self.screen.blit(self.package_image, rect)
+        elif pos in self.metas:
+            self.screen.blit(self.goal_image, rect)
+        if pos in self.caminho:
+            marca = pygame.Rect(rect.x + self.block_size // 4, rect.y + self.block_size // 4,
+                                self.block_size // 2, self.block_size // 2)
+            pygame.draw.rect(self.screen, self.path_color, marca)
+        if pos == self.jogador:
+            pygame.draw.rect(self.screen, self.player_color, rect)
+        return rect
+
+    def draw(self, path=None):
+        world = self.world
+        self.desenhar(Quadro(world.player.position, path, world.packages, world.goals))
+
+    def desenhar(self, quadro):
+        """
+        Desenha um Quadro. O primeiro quadro (ou o primeiro após uma mudança no grid) é
+        completo; os seguintes redesenham só as células que mudaram (posição anterior e nova do
+        jogador, caminho anterior e novo, pacotes coletados e metas entregues) e atualizam na
+        tela apenas esses retângulos.
+        """
+        if self.versao != self.world.versao:
+            self.atualizar_paredes()
+
+        caminho = set(quadro.caminho) if quadro.caminho else set()
+        jogador = quadro.jogador
+        sujas = set()
+        if not self.desenhado:
+            self.pacotes = set(quadro.pacotes)
+            self.metas = set(quadro.metas)
+        else:
+            # Pacotes/metas só diminuem: basta comparar quando a quantidade muda
+            if len(quadro.pacotes) != len(self.pacotes):
+                atuais = set(quadro.pacotes)
+                sujas |= self.pacotes ^ atuais
+                self.pacotes = atuais
+            if len(quadro.metas) != len(self.metas):
+                atuais = set(quadro.metas)
+                sujas |= self.metas ^ atuais
+                self.metas = atuais
+            if caminho != self.caminho:
+                sujas |= caminho ^ self.caminho
+            if jogador != self.jogador:
+                sujas.add(self.jogador)
+                sujas.add(jogador)
+        self.caminho = caminho
+        self.jogador = jogador
+
+        if not self.desenhado:
+            self.screen.blit(self.fundo, (0, 0))
+            for pos in self.pacotes | self.metas | self.caminho | {self.jogador}:
+                self.desenhar_celula(pos)
+            pygame.display.flip()
+            self.desenhado = True
+        elif sujas:
+            pygame.display.update([self.desenhar_celula(pos) for pos in sujas])
+
+    def close(self):
+        pygame.quit()
 
 # ==========================
 # CLASSE MAZE: Lógica do jogo e planejamento de caminhos (A*)
 # ==========================
+class EstadoEpisodio:
+    """
+    Estado mutável de um episódio, guardado por Maze.snapshot: jogador (BasePlayer.estado),
+    cópias dos pacotes, metas e índices espaciais, e os contadores do Maze. O grid, o mapa e as
+    distâncias não entram: continuam os do World, compartilhados entre snapshots.
+    """
+    __slots__ = ("jogador", "pacotes", "metas", "indices", "score", "steps", "num_deliveries", "running")
+
+    def __init__(self, jogador, pacotes, metas, indices, score, steps, num_deliveries, running):
+        self.jogador = jogador
+        self.pacotes = pacotes
+        self.metas = metas
+        self.indices = indices  # (indice_pacotes, indice_metas, indice_alvos)
+        self.score = score
+        self.steps = steps
+        self.num_deliveries = num_deliveries
+        self.running = running
+
 class Maze:
-    def __init__(self, seed=None, player_class=DefaultPlayer): 
-        self.world = World(seed, player_class)  
+    def __init__(self, seed=None, player_class=DefaultPlayer, headless=False, verbose=True, instrumentar=False,
+                 por_segmento=None, fps=None, gravador=None, world=None, **config_mundo):
+        # config_mundo: maze_size, total_items, num_pacotes, densidade, perfil_bateria... (repassados ao World)
+        # world: continua um World já existente (por exemplo um clone) em vez de gerar um novo
+        self.world = World(seed, player_class, headless=headless, **config_mundo) if world is None else world
+        self.verbose = verbose
+        # por_segmento: aplica cada caminho de uma vez (padrão: sempre que não houver renderização)
+        self.por_segmento = headless if por_segmento is None else por_segmento
+        # fps: com renderização, roda a simulação em uma thread sem esperas e desenha os quadros
+        # publicados a essa taxa, descartando os intermediários quando o renderer fica para trás
+        self.fps = fps
+        self.fila_quadros = None
+        self.quadros_descartados = 0
+        # gravador: GravadorResultados compartilhado entre episódios (padrão: acrescenta a resultados.csv)
+        self.gravador = gravador
         self.running = True
         self.score = 0
         self.steps = 0
         self.delay = 10
         self.path = []
-        self.num_deliveries = 0
+        self.num_deliveries = self.world.total_items - len(self.world.goals)
+
+        # Instrumentação: totais do episódio (exportados no CSV quando instrumentar=True) e
+        # ganchos chamados ao fim de cada decisão com o registro daquela decisão.
+        self.instrumentar = instrumentar
+        self.metricas = {
+            "decisoes": 0,
+            "tempo_decisao": 0.0,
+            "tempo_planejamento": 0.0,
+            "tempo_movimento": 0.0,
+            "tempo_render": 0.0,
+            "buscas": 0,
+            "nos_expandidos": 0,
+        }
+        self.ganchos_decisao = []
+
+    def registrar_decisao(self, registro):
+        """
+        Soma o registro de uma decisão aos totais do episódio e repassa aos ganchos.
+        registro traz o alvo, os tempos (s) de escolha do alvo, planejamento, movimento e
+        renderização, e as buscas/nós expandidos feitos durante a decisão.
+        """
+        self.metricas["decisoes"] += 1
+        for chave in ("tempo_decisao", "tempo_planejamento", "tempo_movimento", "tempo_render", "buscas", "nos_expandidos"):
+            self.metricas[chave] += registro[chave]
+        for gancho in self.ganchos_decisao:
+            gancho(self, registro)
+
+    def snapshot(self):
+        """
+        Guarda o estado do episódio (veja EstadoEpisodio) sem copiar o mundo; o mesmo snapshot
+        pode ser restaurado quantas vezes for preciso. As métricas de instrumentação não entram.
+        """
+        world = self.world
+        return EstadoEpisodio(
+            world.player.estado(),
+            world.packages.copiar(),
+            world.goals.copiar(),
+            (world.indice_pacotes.copiar(), world.indice_metas.copiar(), world.indice_alvos.copiar()),
+            self.score, self.steps, self.num_deliveries, self.running,
+        )
+
+    def restaurar(self, estado):
+        """Volta o episódio ao snapshot estado, tirado deste Maze (ou de um clone dele)."""
+        world = self.world
+        world.player.restaurar_estado(estado.jogador)
+        world.packages = estado.pacotes.copiar()
+        world.goals = estado.metas.copiar()
+        world.indice_pacotes, world.indice_metas, world.indice_alvos = (indice.copiar() for indice in estado.indices)
+        self.score = estado.score
+        self.steps = estado.steps
+        self.num_deliveries = estado.num_deliveries
+        self.running = estado.running
+        self.path = []
+        if world.renderer is not None:
+            world.renderer.desenhado = False  # força o próximo quadro a ser desenhado inteiro
+
+    def clonar(self, isolado=False):
+        """
+        Maze headless e silencioso sobre World.clonar(isolado), no mesmo ponto do episódio, para
+        simulações de lookahead. Rode-o com game_loop(salvar=False) para não gravar o resultado.
+        """
+        clone = Maze.__new__(Maze)
+        clone.__dict__.update(self.__dict__)
+        clone.world = self.world.clonar(isolado)
+        clone.verbose = False
+        clone.por_segmento = True
+        clone.fps = None
+        clone.fila_quadros = None
+        clone.gravador = None
+        clone.path = []
+        clone.metricas = dict(self.metricas)
+        clone.ganchos_decisao = []
+        return clone
+
+    def log(self, *args):
+        if self.verbose:
+            print(*args)
 
     def heuristic(self, a, b):
         # Distância de Manhattan
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
     def astar(self, start, goal):
-        maze = self.world.map
-        size = self.world.maze_size
-        neighbors = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-        close_set = set()
-        came_from = {}
-        gscore = {tuple(start): 0}
-        fscore = {tuple(start): self.heuristic(start, goal)}
-        oheap = []
-        heapq.heappush(oheap, (fscore[tuple(start)], tuple(start)))
-        while oheap:
-            current = heapq.heappop(oheap)[1]
-            if list(current) == goal:
-                data = []
-                while current in came_from:
-                    data.append(list(current))
-                    current = came_from[current]
-                data.reverse()
-                return data
-            close_set.add(current)
-            for dx, dy in neighbors:
-                neighbor = (current[0] + dx, current[1] + dy)
-                tentative_g = gscore[current] + 1
-                if 0 <= neighbor[0] < size and 0 <= neighbor[1] < size:
-                    if maze[neighbor[1]][neighbor[0]] == 1:
-                        continue
-                else:
-                    continue
-                if neighbor in close_set and tentative_g >= gscore.get(neighbor, 0):
-                    continue
-                if tentative_g < gscore.get(neighbor, float('inf')) or neighbor not in [i[1] for i in oheap]:
-                    came_from[neighbor] = current
-                    gscore[neighbor] = tentative_g
-                    fscore[neighbor] = tentative_g + self.heuristic(neighbor, goal)
-                    heapq.heappush(oheap, (fscore[neighbor], neighbor))
-        return []
+        return self.world.caminho(start, goal)[1]
+
+    def avancar_passo(self, pos):
+        self.world.player.position = pos
+        self.steps += 1
+        # Consumo da bateria: -1 por movimento se bateria >= 0, caso contrário -5
+        self.world.player.battery -= 1
+        if self.world.player.battery >= 0:
+            self.score -= 1
+        else:
+            self.score -= 5
+        # Recarrega a bateria se estiver no recharger
+        if self.world.recharger and pos == self.world.recharger:
+            self.world.player.battery = pathfinding.BATERIA_RECARGA
+            self.log("Bateria recarregada!")
 
-    def salvar_resultado(self, player_name, seed):
+    def avancar_segmento(self, path):
+        """
+        Aplica o caminho inteiro de uma vez, com o mesmo resultado de chamar avancar_passo para
+        cada posição: entre recargas, os passos com bateria >= 0 custam 1 e os demais 5, e a
+        passagem pelo recarregador é localizada pelo índice no caminho.
+        """
+        player = self.world.player
+        recharger = self.world.recharger
+        bateria = player.battery
+        inicio = 0
+        while True:
+            try:
+                fim = path.index(recharger, inicio) + 1 if recharger else len(path)
+            except ValueError:
+                fim = len(path)
+            passos = fim - inicio
+            com_carga = min(max(bateria, 0), passos)  # passos k com bateria - k >= 0
+            self.score -= com_carga + 5 * (passos - com_carga)
+            bateria -= passos
+            if fim == len(path) and path[-1] != recharger:
+                break
+            bateria = pathfinding.BATERIA_RECARGA
+            self.log("Bateria recarregada!")
+            if fim == len(path):
+                break
+            inicio = fim
+        player.battery = bateria
+        player.position = path[-1]
+        self.steps += len(path)
+
+    def resultado(self, player_name, seed):
+        # Mesmas colunas, na mesma ordem, de colunas_resultado(self.instrumentar)
         resultado = {
             "player": player_name,
             "seed": seed,
@@ -670,18 +1290,106 @@ class Maze:
             "steps": self.steps,
             "deliveries": self.num_deliveries,
             "battery": self.world.player.battery,
-            "execution_time": self.tempo_execucao  
+            "execution_time": self.tempo_execucao,
+            "perfil_bateria": self.world.player.perfil_bateria,
+            "maze_size": self.world.maze_size,
+            "tempo_decisao": round(self.metricas["tempo_decisao"], 6),
+            "tempo_planejamento": round(self.metricas["tempo_planejamento"], 6),
+            "tempo_movimento": round(self.metricas["tempo_movimento"], 6),
+            "tempo_render": round(self.metricas["tempo_render"], 6),
         }
+        if self.instrumentar:
+            decisoes = self.metricas["decisoes"]
+            resultado.update({
+                "decisoes": decisoes,
+                "buscas": self.metricas["buscas"],
+                "buscas_por_decisao": round(self.metricas["buscas"] / decisoes, 2) if decisoes else 0.0,
+                "nos_expandidos": self.metricas["nos_expandidos"],
+            })
+        return resultado
 
-        arquivo = "resultados.csv"
-        escrever_cabecalho = not os.path.exists(arquivo)
-        with open(arquivo, "a", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=resultado.keys())
-            if escrever_cabecalho:
-                writer.writeheader()
-            writer.writerow(resultado)
+    def salvar_resultado(self, player_name, seed):
+        linha = self.resultado(player_name, seed)
+        if self.gravador is not None:
+            self.gravador.escrever(linha)
+        else:
+            escrever_resultados([linha])
 
-    def game_loop(self):
+    def publicar_quadro(self):
+        """
+        Coloca o estado atual na fila limitada de quadros. Se a fila estiver cheia, descarta o
+        quadro mais antigo em vez de esperar: a simulação nunca é freada pelo renderer.
+        """
+        world = self.world
+        if self._itens_quadro is None or len(self._itens_quadro[0]) != len(world.packages) \
+                or len(self._itens_quadro[1]) != len(world.goals):
+            self._itens_quadro = (tuple(world.packages), tuple(world.goals))
+        quadro = Quadro(world.player.position, self.path, *self._itens_quadro)
+        while True:
+            try:
+                self.fila_quadros.put_nowait(quadro)
+                return
+            except queue.Full:
+                try:
+                    self.fila_quadros.get_nowait()
+                    self.quadros_descartados += 1
+                except queue.Empty:
+                    pass
+
+    def game_loop(self, salvar=True):
+        renderer = self.world.renderer
+        if renderer is not None and self.fps:
+            self.game_loop_desacoplado(salvar)
+        else:
+            self.simular(salvar)
+        if renderer is not None:
+            renderer.close()
+
+    def game_loop_desacoplado(self, salvar=True):
+        """
+        Roda a simulação em uma thread, publicando um quadro por passo, enquanto esta thread
+        (a do pygame) desenha o quadro mais recente a self.fps quadros por segundo.
+        """
+        renderer = self.world.renderer
+        self.fila_quadros = queue.Queue(maxsize=4)
+        self._itens_quadro = None
+        fim = object()
+
+        def rodar():
+            try:
+                self.simular(salvar)
+            finally:
+                self.fila_quadros.put(fim)
+
+        simulacao = threading.Thread(target=rodar, daemon=True)
+        simulacao.start()
+        relogio = pygame.time.Clock()
+        terminou = False
+        while not terminou:
+            for evento in pygame.event.get():
+                if evento.type == pygame.QUIT:
+                    self.running = False
+            # Consome tudo o que chegou e desenha só o estado mais recente
+            ultimo = None
+            while True:
+                try:
+                    item = self.fila_quadros.get_nowait()
+                except queue.Empty:
+                    break
+                if item is fim:
+                    terminou = True
+                    break
+                if ultimo is not None:
+                    self.quadros_descartados += 1
+                ultimo = item
+            if ultimo is not None:
+                renderer.desenhar(ultimo)
+            relogio.tick(self.fps)
+        simulacao.join()
+        self.fila_quadros = None
+        self.log("Quadros descartados pelo renderer:", self.quadros_descartados)
+
+    def simular(self, salvar=True):
         # O jogo termina quando o número de entregas realizadas é igual ao total de itens.
         start_time = time.time() 
         while self.running:
@@ -689,62 +1397,372 @@ class Maze:
                 self.running = False
                 break
 
+            buscas_antes = pathfinding.contadores["buscas"]
+            expandidos_antes = pathfinding.contadores["expandidos"]
+            t_inicio = time.perf_counter()
+
             # Utiliza a estratégia do jogador para escolher o alvo
-            target = self.world.player.escolher_alvo(self.world)
-            if target is None:
+            escolha = self.world.player.escolher_alvo(self.world)
+            t_decisao = time.perf_counter()
+            if escolha is None:
                 self.running = False
                 break
 
-            self.path = self.astar(self.world.player.position, target)
+            # Reaproveita o caminho quando a estratégia já o planejou
+            if isinstance(escolha, Decisao):
+                target = escolha.alvo
+                self.path = escolha.caminho
+            else:
+                target = escolha
+                self.path = self.astar(self.world.player.position, target)
+            t_planejamento = time.perf_counter()
             if not self.path:
-                print("Nenhum caminho encontrado para o alvo", target)
+                self.log("Nenhum caminho encontrado para o alvo", target)
                 self.running = False
                 break
 
             # Segue o caminho calculado
-            for pos in self.path:
-                self.world.player.position = pos
-                self.steps += 1
-                # Consumo da bateria: -1 por movimento se bateria >= 0, caso contrário -5
-                self.world.player.battery -= 1
-                if self.world.player.battery >= 0:
-                    self.score -= 1
-                else:
-                    self.score -= 5
-                # Recarrega a bateria se estiver no recharger
-                if self.world.recharger and pos == self.world.recharger:
-                    self.world.player.battery = 70
-                    print("Bateria recarregada!")
-                self.world.draw_world(self.path)
-                pygame.time.wait(self.delay)
+            tempo_render = 0.0
+            if self.por_segmento:
+                self.avancar_segmento(self.path)
+            else:
+                for pos in self.path:
+                    self.avancar_passo(pos)
+                    if self.fila_quadros is not None:
+                        self.publicar_quadro()
+                    elif self.world.renderer is not None:
+                        t_render = time.perf_counter()
+                        self.world.draw_world(self.path)
+                        pygame.time.wait(self.delay)
+                        tempo_render += time.perf_counter() - t_render
 
             # Ao chegar ao alvo, processa a coleta ou entrega:
             if self.world.player.position == target:
                 # Se for local de coleta, pega o pacote.
                 if target in self.world.packages:
                     self.world.player.cargo += 1
-                    self.world.packages.remove(target)
-                    print("Pacote coletado em", target, "Cargo agora:", self.world.player.cargo)
+                    self.world.coletar(target)
+                    self.log("Pacote coletado em", target, "Cargo agora:", self.world.player.cargo)
                 # Se for local de entrega e o jogador tiver pelo menos um pacote, entrega.
                 elif target in self.world.goals and self.world.player.cargo > 0:
                     self.world.player.cargo -= 1
                     self.num_deliveries += 1
-                    self.world.goals.remove(target)
+                    self.world.entregar(target)
                     self.score += 85
-                    print("Pacote entregue em", target, "Cargo agora:", self.world.player.cargo)
-            print(f"Passos: {self.steps}, Pontuação: {self.score}, Cargo: {self.world.player.cargo}, Bateria: {self.world.player.battery}, Entregas: {self.num_deliveries}")
-
-        print("Fim de jogo!")
-        print("Pontuação final:", self.score)
-        print("Total de passos:", self.steps)
+                    self.log("Pacote entregue em", target, "Cargo agora:", self.world.player.cargo)
+
+            self.registrar_decisao({
+                "alvo": target,
+                "passos": len(self.path),
+                "tempo_decisao": t_decisao - t_inicio,
+                "tempo_planejamento": t_planejamento - t_decisao,
+                "tempo_movimento": time.perf_counter() - t_planejamento - tempo_render,
+                "tempo_render": tempo_render,
+                "buscas": pathfinding.contadores["buscas"] - buscas_antes,
+                "nos_expandidos": pathfinding.contadores["expandidos"] - expandidos_antes,
+            })
+            self.log(f"Passos: {self.steps}, Pontuação: {self.score}, Cargo: {self.world.player.cargo}, Bateria: {self.world.player.battery}, Entregas: {self.num_deliveries}")
+
+        self.log("Fim de jogo!")
+        self.log("Pontuação final:", self.score)
+        self.log("Total de passos:", self.steps)
 
         end_time = time.time() 
         self.tempo_execucao = round(end_time - start_time, 2) 
-        print("Tempo de execução:", self.tempo_execucao, "segundos") 
+        self.log("Tempo de execução:", self.tempo_execucao, "segundos")
 
-        self.salvar_resultado(self.world.player.__class__.__name__, self.world.seed)  
+        if salvar:
+            self.salvar_resultado(self.world.player.__class__.__name__, self.world.seed)
 
-        pygame.quit()
+# ==========================
+# RESULTADOS E VARREDURA PARALELA (seeds x players)
+# ==========================
+PLAYERS = {
+    "DefaultPlayer": DefaultPlayer,
+    'EnchacedPlayer' : EnchacedPlayer,
+    "DijkstraPlayer": DijkstraPlayer,
+    "astarPlayer": astarPlayer,
+    "HybridPlayer": HybridPlayer,
+    "HybridClusterPlayer": HybridClusterPlayer,
+    "TourPlayer": TourPlayer,
+    "BatteryPlayer": BatteryPlayer,
+    "RolloutPlayer": RolloutPlayer,
+}
+
+# Colunas da linha de resultado, na ordem de Maze.resultado; com instrumentar=True vêm
+# também as de COLUNAS_INSTRUMENTACAO
+COLUNAS_RESULTADO = ("player", "seed", "score", "steps", "deliveries", "battery", "execution_time",
+                     "perfil_bateria", "maze_size", "tempo_decisao", "tempo_planejamento",
+                     "tempo_movimento", "tempo_render")
+COLUNAS_INSTRUMENTACAO = ("decisoes", "buscas", "buscas_por_decisao", "nos_expandidos")
+
+def colunas_resultado(instrumentar=False):
+    return list(COLUNAS_RESULTADO) + (list(COLUNAS_INSTRUMENTACAO) if instrumentar else [])
+
+class GravadorResultados:
+    """
+    Grava linhas de resultado em um CSV aberto uma única vez, acumulando-as em memória e
+    descarregando a cada `lote` linhas (e ao fechar).
+
+    O arquivo é aberto em modo append: se já existir com outro cabeçalho, levanta ValueError
+    em vez de misturar colunas. Com `colunas` (veja colunas_resultado) ele é aberto e
+    conferido já na criação, antes de qualquer episódio rodar; sem elas, na primeira linha
+    recebida. Não é compartilhado entre processos: na varredura paralela os workers devolvem
+    as linhas e só o processo principal escreve.
+    """
+
+    def __init__(self, arquivo="resultados.csv", lote=64, colunas=None):
+        self.arquivo = arquivo
+        self.lote = lote
+        self.pendentes = []
+        self.linhas_gravadas = 0
+        self._arquivo = None
+        self._writer = None
+        if colunas is not None:
+            self._abrir(colunas)
+
+    def _abrir(self, colunas):
+        diretorio = os.path.dirname(self.arquivo)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        existente = os.path.exists(self.arquivo) and os.path.getsize(self.arquivo) > 0
+        if existente:
+            with open(self.arquivo, newline="") as f:
+                cabecalho = next(csv.reader(f), [])
+            if cabecalho != list(colunas):
+                raise ValueError(
+                    f"{self.arquivo} já existe com outras colunas ({', '.join(cabecalho)}); "
+                    f"esperado: {', '.join(colunas)}. Use outro arquivo de saída (--saida)."
+                )
+        self._arquivo = open(self.arquivo, "a", newline="")
+        self._writer = csv.DictWriter(self._arquivo, fieldnames=list(colunas))
+        if not existente:
+            self._writer.writeheader()
+
+    def escrever(self, linha):
+        if self._writer is None:
+            self._abrir(linha.keys())
+        self.pendentes.append(linha)
+        if len(self.pendentes) >= self.lote:
+            self.flush()
+
+    def flush(self):
+        if self.pendentes:
+            self._writer.writerows(self.pendentes)
+            self.linhas_gravadas += len(self.pendentes)
+            self.pendentes = []
+        if self._arquivo is not None:
+            self._arquivo.flush()
+
+    def close(self):
+        if self._arquivo is not None:
+            self.flush()
+            self._arquivo.close()
+            self._arquivo = None
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class GravadorColunar:
+    """
+    Grava linhas de resultado em formato colunar tipado (Parquet ou .npz do NumPy), em um layout
+    particionado por varredura:
+
+        <diretorio>/varredura=<data-hora>-<pid>/parte-00000.parquet
+                                                 parte-00001.parquet ...
+
+    Cada varredura cria a própria partição e cada lote descarregado vira uma nova parte, então
+    nada é reescrito: rodar mais varreduras só acrescenta diretórios. As colunas são fixadas
+    pelo primeiro lote descarregado (int64, float64 ou texto) e os lotes seguintes são convertidos
+    para esses tipos, então todas as partes da varredura têm o mesmo esquema.
+    plots/dados.py lê o diretório inteiro (ou uma parte isolada) de volta em um DataFrame.
+    """
+
+    EXTENSOES = {"parquet": ".parquet", "npz": ".npz"}
+
+    def __init__(self, diretorio="resultados", formato="parquet", lote=4096):
+        if formato not in self.EXTENSOES:
+            raise ValueError(f"formato colunar desconhecido: {formato} (use parquet ou npz)")
+        if formato == "parquet" and pa is None:
+            raise RuntimeError("pyarrow não está instalado; use --formato npz ou csv")
+        if formato == "npz" and np is None:
+            raise RuntimeError("numpy não está instalado; use --formato csv")
+        self.diretorio = diretorio
+        self.formato = formato
+        self.lote = lote
+        self.pendentes = []
+        self.linhas_gravadas = 0
+        self.colunas = None
+        self.tipos = None
+        self.particao = None
+        self.partes = 0
+
+    def _abrir(self):
+        nome = f"varredura={time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        particao = os.path.join(self.diretorio, nome)
+        sufixo = 1
+        while os.path.exists(particao):
+            particao = os.path.join(self.diretorio, f"{nome}-{sufixo}")
+            sufixo += 1
+        os.makedirs(particao)
+        self.particao = particao
+
+    def escrever(self, linha):
+        if self.colunas is None:
+            self.colunas = list(linha.keys())
+            self._abrir()
+        elif list(linha.keys()) != self.colunas:
+            raise ValueError(f"linha com colunas diferentes das da varredura: {', '.join(linha.keys())}")
+        self.pendentes.append(linha)
+        if len(self.pendentes) >= self.lote:
+            self.flush()
+
+    def _tipos(self):
+        tipos = {}
+        for coluna in self.colunas:
+            valores = [linha[coluna] for linha in self.pendentes]
+            if all(isinstance(v, int) for v in valores):
+                tipos[coluna] = "int64"
+            elif all(isinstance(v, (int, float)) for v in valores):
+                tipos[coluna] = "float64"
+            else:
+                tipos[coluna] = "str"
+        return tipos
+
+    @staticmethod
+    def _converter(coluna, valores, tipo):
+        """Valores de um lote no tipo fixado para a coluna (ValueError se não couberem nele)."""
+        if tipo == "str":
+            return [str(v) for v in valores]
+        if tipo == "float64":
+            if not all(isinstance(v, (int, float)) for v in valores):
+                raise ValueError(f"coluna {coluna} é float64, mas o lote tem valores não numéricos")
+            return [float(v) for v in valores]
+        if not all(isinstance(v, int) or (isinstance(v, float) and v.is_integer()) for v in valores):
+            raise ValueError(f"coluna {coluna} é int64, mas o lote tem valores não inteiros")
+        return [int(v) for v in valores]
+
+    def flush(self):
+        if not self.pendentes:
+            return
+        if self.tipos is None:
+            self.tipos = self._tipos()
+        tipos = self.tipos
+        caminho = os.path.join(self.particao, f"parte-{self.partes:05d}{self.EXTENSOES[self.formato]}")
+        colunas = {c: self._converter(c, [linha[c] for linha in self.pendentes], tipos[c]) for c in self.colunas}
+        if self.formato == "parquet":
+            tipos_arrow = {"int64": pa.int64(), "float64": pa.float64(), "str": pa.string()}
+            tabela = pa.table({c: pa.array(v, type=tipos_arrow[tipos[c]]) for c, v in colunas.items()})
+            pq.write_table(tabela, caminho)
+        else:
+            np.savez_compressed(caminho, **{c: np.array(v, dtype=tipos[c]) for c, v in colunas.items()})
+        self.partes += 1
+        self.linhas_gravadas += len(self.pendentes)
+        self.pendentes = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def abrir_gravador(saida=None, formato="csv", colunas=None):
+    """
+    Cria o gravador de resultados do formato pedido. saida é o arquivo CSV (padrão:
+    resultados.csv) ou, nos formatos colunares, o diretório do dataset (padrão: resultados).
+    Com colunas, o cabeçalho de um CSV já existente é conferido aqui (ValueError se for outro);
+    os formatos colunares gravam cada varredura na própria partição e não precisam dele.
+    """
+    if formato == "csv":
+        return GravadorResultados(saida or "resultados.csv", colunas=colunas)
+    return GravadorColunar(saida or "resultados", formato)
+
+def escrever_resultados(linhas, arquivo="resultados.csv"):
+    """
+    Acrescenta as linhas de resultado ao CSV, escrevendo o cabeçalho se o arquivo ainda não existir.
+    """
+    with GravadorResultados(arquivo) as gravador:
+        for linha in linhas:
+            gravador.escrever(linha)
+
+def rodar_episodio(episodio):
+    """
+    Roda um episódio headless e silencioso e devolve a linha de resultado.
+    Recebe a tupla (seed, nome_do_player, config_mundo, instrumentar) para poder ser enviada
+    aos processos do pool.
+    """
+    seed, player_name, config_mundo, instrumentar = episodio
+    maze = Maze(seed=seed, player_class=PLAYERS[player_name], headless=True, verbose=False,
+                instrumentar=instrumentar, **config_mundo)
+    maze.game_loop(salvar=False)
+    return maze.resultado(player_name, seed)
+
+def verificar_segmentos(seeds, player_names, config_mundo=None):
+    """
+    Roda cada (seed, player) passo a passo e por segmento e compara pontuação, passos,
+    bateria, entregas e posição final. Retorna a lista de episódios divergentes.
+    """
+    config_mundo = config_mundo or {}
+    divergentes = []
+    for seed in seeds:
+        for name in player_names:
+            finais = []
+            for por_segmento in (False, True):
+                maze = Maze(seed=seed, player_class=PLAYERS[name], headless=True, verbose=False,
+                            por_segmento=por_segmento, **config_mundo)
+                maze.game_loop(salvar=False)
+                player = maze.world.player
+                finais.append((maze.score, maze.steps, player.battery, maze.num_deliveries, player.position))
+            if finais[0] != finais[1]:
+                divergentes.append((seed, name, finais[0], finais[1]))
+    return divergentes
+
+def rodar_varredura(seeds, player_names, workers=None, arquivo=None, config_mundo=None, instrumentar=False,
+                    gravador=None, formato="csv", perfis=None):
+    """
+    Roda todos os pares (seed, player) distribuídos em um pool de processos; com perfis, cada
+    par é rodado uma vez por perfil de bateria (seed -> perfil -> player), tudo no mesmo pool
+    e no mesmo dataset.
+    Cada episódio usa o gerador do próprio World, então o resultado não depende do processo
+    que o executou. As linhas chegam ao processo principal na ordem seed -> player e vão
+    sendo gravadas à medida que ficam prontas por um único gravador (o recebido, ou um
+    aberto por abrir_gravador para esta varredura, que confere a saída antes de rodar).
+    """
+    config_mundo = config_mundo or {}
+    if perfis:
+        configs = [{**config_mundo, "perfil_bateria": perfil} for perfil in perfis]
+    else:
+        configs = [config_mundo]
+    episodios = [(seed, name, config, instrumentar) for seed in seeds for config in configs for name in player_names]
+    proprio = gravador is None
+    if proprio:
+        gravador = abrir_gravador(arquivo, formato, colunas_resultado(instrumentar))
+    linhas = []
+    try:
+        if workers == 1:
+            for ep in episodios:
+                linhas.append(rodar_episodio(ep))
+                gravador.escrever(linhas[-1])
+        else:
+            workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(episodios) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for linha in pool.map(rodar_episodio, episodios, chunksize=chunksize):
+                    linhas.append(linha)
+                    gravador.escrever(linha)
+    finally:
+        if proprio:
+            gravador.close()
+        else:
+            gravador.flush()
+    return linhas
 
 # ==========================
 # PONTO DE ENTRADA PRINCIPAL
@@ -757,51 +1775,98 @@ if __name__ == "__main__":
 
     parser.add_argument("--multi", action="store_true", help="Rodar todos os players com a mesma seed")
     parser.add_argument("--player", type=str, default="DefaultPlayer", choices=[
-        "DefaultPlayer", "DijkstraPlayer", "astarPlayer", "HybridPlayer", "HybridClusterPlayer"
+        "DefaultPlayer", "DijkstraPlayer", "astarPlayer", "HybridPlayer", "HybridClusterPlayer", "TourPlayer",
+        "BatteryPlayer", "RolloutPlayer"
     ], help="Escolha do tipo de player")
+    parser.add_argument("--headless", action="store_true", help="Roda sem pygame (sem janela, sem espera entre passos)")
+    parser.add_argument("--silencioso", action="store_true", help="Não imprime o progresso de cada alvo")
+    parser.add_argument("--workers", type=int, help="Número de processos na varredura headless de --maps (padrão: todos os núcleos)")
+    parser.add_argument("--tamanho", type=int, default=50, help="Lado do grid (padrão: 50)")
+    parser.add_argument("--itens", type=int, default=6, help="Número de entregas (padrão: 6)")
+    parser.add_argument("--pacotes", type=int, help="Número de locais de coleta (padrão: 2x o número de entregas)")
+    parser.add_argument("--perfil", nargs='+', choices=list(PERFIS_BATERIA), default=["aventureiro"],
+                        help="Perfis de bateria; com vários, cada episódio roda uma vez por perfil (padrão: aventureiro)")
+    parser.add_argument("--margem-bateria", type=float,
+                        help="Fração do custo de ida e volta que a bateria precisa cobrir (substitui a do perfil)")
+    parser.add_argument("--densidade", type=float, default=1.0, help="Multiplicador da quantidade de obstáculos (padrão: 1.0)")
+    parser.add_argument("--verificar-segmentos", action="store_true",
+                        help="Compara a execução passo a passo com a execução por segmento e sai")
+    parser.add_argument("--saida", help="Arquivo CSV de resultados (padrão: resultados.csv) ou diretório do "
+                                        "dataset nos formatos colunares (padrão: resultados)")
+    parser.add_argument("--formato", choices=["csv", "parquet", "npz"], default="csv",
+                        help="Formato dos resultados: csv, ou parquet/npz particionados por varredura (padrão: csv)")
+    parser.add_argument("--fps", type=int,
+                        help="Modo visual desacoplado: simula sem esperas e desenha a essa taxa de quadros")
+    parser.add_argument("--orcamento-rollout", type=float,
+                        help="Prazo em segundos por decisão do RolloutPlayer (padrão: sem prazo, número fixo de "
+                             "rollouts; com prazo o resultado depende da velocidade da máquina)")
+    parser.add_argument("--instrumentar", action="store_true",
+                        help="Acrescenta ao CSV o tempo por fase (decisão, planejamento, movimento, render) e as buscas feitas")
     args = parser.parse_args()
+    if args.orcamento_rollout is not None:
+        RolloutPlayer.orcamento = args.orcamento_rollout
+    config_mundo = {"maze_size": args.tamanho, "total_items": args.itens,
+                    "num_pacotes": args.pacotes, "densidade": args.densidade,
+                    "perfil_bateria": args.perfil[0], "margem_bateria": args.margem_bateria}
+    opcoes = {"headless": args.headless, "verbose": not args.silencioso, "instrumentar": args.instrumentar,
+              "fps": args.fps, **config_mundo}
+
+    players = PLAYERS
+
+    if args.verificar_segmentos:
+        nomes = list(players) if args.multi else [args.player]
+        divergentes = verificar_segmentos(args.maps or [args.seed or 42], nomes, config_mundo)
+        for seed, name, passo, segmento in divergentes:
+            print(f"Divergência em {name} seed {seed}: passo a passo {passo} != por segmento {segmento}")
+        print("Execução por segmento idêntica à passo a passo" if not divergentes else f"{len(divergentes)} episódios divergentes")
+        sys.exit(1 if divergentes else 0)
+
+    # Um único gravador para toda a execução: a saída é aberta uma vez e escrita em lotes
+    with abrir_gravador(args.saida, args.formato, colunas_resultado(args.instrumentar)) as gravador:
+        opcoes["gravador"] = gravador
+        if args.maps and args.headless:
+            # Sem interface gráfica os episódios são independentes: distribui entre processos
+            nomes = list(players) if args.multi else [args.player]
+            linhas = rodar_varredura(args.maps, nomes, workers=args.workers, config_mundo=config_mundo,
+                                     instrumentar=args.instrumentar, gravador=gravador, perfis=args.perfil)
+            print(f"{len(linhas)} episódios concluídos")
 
-    players = {
-        "DefaultPlayer": DefaultPlayer,
-        'EnchacedPlayer' : EnchacedPlayer,
-        "DijkstraPlayer": DijkstraPlayer,
-        "astarPlayer": astarPlayer,
-        "HybridPlayer": HybridPlayer,
-        "HybridClusterPlayer": HybridClusterPlayer  
-    }
-
-    if args.maps:
-        seeds = args.maps  # lista de seeds fornecida
-
-        if args.multi:
-            # Roda todos os players para cada mapa (seed)
-            for seed in seeds:
-                for name, cls in players.items():
-                    print(f"\n======================")
-                    print(f"  Rodando {name} na seed {seed}")
-                    print(f"======================")
-                    maze = Maze(seed=seed, player_class=cls)
-                    maze.game_loop()
         else:
-            # Roda somente o player escolhido para cada seed
-            player_cls = players.get(args.player, DefaultPlayer)
-            for seed in seeds:
-                print(f"\n======================")
-                print(f"  Rodando {args.player} na seed {seed}")
-                print(f"======================")
-                maze = Maze(seed=seed, player_class=player_cls)
-                maze.game_loop()
+            # Execuções sequenciais (visuais): uma rodada completa por perfil de bateria
+            for perfil in args.perfil:
+                opcoes["perfil_bateria"] = perfil
+                if args.maps:
+                    seeds = args.maps  # lista de seeds fornecida
+
+                    if args.multi:
+                        # Roda todos os players para cada mapa (seed)
+                        for seed in seeds:
+                            for name, cls in players.items():
+                                print(f"\n======================")
+                                print(f"  Rodando {name} na seed {seed}")
+                                print(f"======================")
+                                maze = Maze(seed=seed, player_class=cls, **opcoes)
+                                maze.game_loop()
+                    else:
+                        # Roda somente o player escolhido para cada seed
+                        player_cls = players.get(args.player, DefaultPlayer)
+                        for seed in seeds:
+                            print(f"\n======================")
+                            print(f"  Rodando {args.player} na seed {seed}")
+                            print(f"======================")
+                            maze = Maze(seed=seed, player_class=player_cls, **opcoes)
+                            maze.game_loop()
 
-    else:
-        if args.multi:
-            for name, cls in players.items():
-                print(f"\n======================")
-                print(f"  Rodando com {name}")
-                print(f"======================")
-                maze = Maze(seed=args.seed or 42, player_class=cls)
-                maze.game_loop()
-        else:
-            player_cls = players.get(args.player, DefaultPlayer)
-            maze = Maze(seed=args.seed or 42, player_class=player_cls)
-            maze.game_loop()
+                else:
+                    if args.multi:
+                        for name, cls in players.items():
+                            print(f"\n======================")
+                            print(f"  Rodando com {name}")
+                            print(f"======================")
+                            maze = Maze(seed=args.seed or 42, player_class=cls, **opcoes)
+                            maze.game_loop()
+                    else:
+                        player_cls = players.get(args.player, DefaultPlayer)
+                        maze = Maze(seed=args.seed or 42, player_class=player_cls, **opcoes)
+                        maze.game_loop()
 
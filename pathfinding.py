@@ -0,0 +1,670 @@
+import heapq
+from array import array
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # os campos vetorizados são opcionais; as BFS puras não dependem do numpy
+    np = None
+
+# Bateria depois de pisar no recarregador (regra do jogo, usada pelo Maze, pelas buscas e pelo
+# planejador de rotas)
+BATERIA_RECARGA = 70
+
+# Tamanho mínimo de grid a partir do qual os campos de distância usam a versão vetorizada
+LIMIAR_NUMPY = 200
+
+# Acima desse número de campos ainda não calculados, as consultas de TabelaDistancias com
+# vários pontos de interesse fazem uma única BFS a partir da posição em vez de criar os campos
+LIMITE_CAMPOS = 64
+
+# Contadores acumulados de todas as buscas do processo (lidos pelo benchmark e pela
+# instrumentação do Maze). Cada busca soma os seus totais uma vez, ao terminar.
+contadores = {"buscas": 0, "expandidos": 0, "empilhados": 0}
+
+
+def registrar_busca(expandidos, empilhados):
+    contadores["buscas"] += 1
+    contadores["expandidos"] += expandidos
+    contadores["empilhados"] += empilhados
+
+
+def zerar_contadores():
+    for chave in contadores:
+        contadores[chave] = 0
+
+
+class Grid:
+    """
+    Representação plana do mapa usada por todas as buscas.
+
+    O mapa recebe uma borda de obstáculos e é guardado em um bytearray (1 = livre), indexado
+    por um id inteiro de célula: (x + 1) * W + (y + 1), com W = size + 2. A ordem dos ids é a
+    mesma das tuplas (x, y), então os desempates dos heaps continuam idênticos aos das versões
+    com tuplas. Graças à borda, os vizinhos são só deslocamentos fixos (+W, -W, +1, -1), sem
+    checagem de limites.
+
+    gscore/came_from são arrays planos alocados uma vez e reaproveitados entre buscas: cada
+    busca recebe um número de geração e uma entrada só vale se o carimbo da célula for o da
+    busca atual, então nada precisa ser limpo entre uma busca e outra.
+    """
+
+    def __init__(self, mapa):
+        size = len(mapa)
+        W = size + 2
+        self.size = size
+        self.W = W
+        self.livre = bytearray(W * W)
+        # Copia coluna a coluna (o id é ordenado por x), invertendo 0/1 sem laço por célula
+        inverte = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+        for x, coluna in enumerate(zip(*mapa)):
+            inicio = (x + 1) * W + 1
+            self.livre[inicio:inicio + size] = bytes(coluna).translate(inverte)
+        # Mesma ordem de expansão das buscas originais: (1, 0), (-1, 0), (0, 1), (0, -1)
+        self.offsets = (W, -W, 1, -1)
+        self._busca = 0
+        self._visto = None
+        self._livre_np_cache = None
+
+    def copia(self):
+        """
+        Grid do mesmo mapa (livre e offsets compartilhados, nunca alterados depois da
+        construção) com áreas de trabalho próprias: buscas em cópias diferentes podem rodar em
+        threads diferentes ao mesmo tempo.
+        """
+        copia = Grid.__new__(Grid)
+        copia.size = self.size
+        copia.W = self.W
+        copia.livre = self.livre
+        copia.offsets = self.offsets
+        copia._busca = 0
+        copia._visto = None
+        copia._livre_np_cache = self._livre_np_cache
+        return copia
+
+    def _nova_busca(self):
+        if self._visto is None:
+            n = self.W * self.W
+            self._visto = [0] * n
+            self._fechado = [0] * n
+            self.gscore = [0] * n
+            self.came_from = [0] * n
+        self._busca += 1
+        return self._busca
+
+    def id(self, pos):
+        return (pos[0] + 1) * self.W + pos[1] + 1
+
+    def pos(self, cell):
+        x, y = divmod(cell, self.W)
+        return (x - 1, y - 1)
+
+    def astar(self, start, goal, com_caminho=True):
+        """
+        A* 4-conexo de custo unitário com heurística de Manhattan.
+        Retorna (custo, caminho), onde caminho é a lista de posições (x, y) após start até goal
+        (vazia se start == goal ou se não houver caminho) e custo é float('inf') quando goal é
+        inalcançável.
+
+        O conjunto aberto usa remoção preguiçosa: entradas antigas do heap são descartadas ao
+        sair, comparando com o conjunto fechado. A heurística é consistente, então um nó
+        fechado nunca precisa ser reaberto.
+        """
+        W = self.W
+        s = self.id(start)
+        g = self.id(goal)
+        gx, gy = divmod(g, W)
+        livre = self.livre
+        offsets = self.offsets
+        busca = self._nova_busca()
+        visto = self._visto
+        fechado = self._fechado
+        gscore = self.gscore
+        came_from = self.came_from
+
+        visto[s] = busca
+        gscore[s] = 0
+        sx, sy = divmod(s, W)
+        oheap = [(abs(sx - gx) + abs(sy - gy), s)]
+        expandidos = 0
+        empilhados = 1
+        while oheap:
+            current = heapq.heappop(oheap)[1]
+            if fechado[current] == busca:
+                continue
+            if current == g:
+                registrar_busca(expandidos, empilhados)
+                if not com_caminho:
+                    return gscore[g], []
+                data = []
+                while current != s:
+                    data.append(self.pos(current))
+                    current = came_from[current]
+                data.reverse()
+                return gscore[g], data
+            fechado[current] = busca
+            expandidos += 1
+
+            tentative_g = gscore[current] + 1
+            for off in offsets:
+                neighbor = current + off
+                if not livre[neighbor] or fechado[neighbor] == busca:
+                    continue
+                if visto[neighbor] != busca or tentative_g < gscore[neighbor]:
+                    visto[neighbor] = busca
+                    gscore[neighbor] = tentative_g
+                    came_from[neighbor] = current
+                    nx, ny = divmod(neighbor, W)
+                    heapq.heappush(oheap, (tentative_g + abs(nx - gx) + abs(ny - gy), neighbor))
+                    empilhados += 1
+
+        registrar_busca(expandidos, empilhados)
+        return float('inf'), []
+
+    def dijkstra_multi_target(self, start, targets):
+        """
+        Busca do alvo mais próximo de start entre targets.
+        Retorna ((x, y), distância) ou (None, float('inf')) se nenhum alvo for alcançável.
+
+        Todo passo custa 1, então basta uma BFS por níveis (sem heap). Empates dentro do mesmo
+        nível são resolvidos pela menor posição (x, y), como fazia o Dijkstra com heap.
+        """
+        alvos = {self.id(t) for t in targets}
+        livre = self.livre
+        offsets = self.offsets
+        busca = self._nova_busca()
+        visto = self._visto
+
+        s = self.id(start)
+        visto[s] = busca
+        fronteira = [s]
+        d = 0
+        expandidos = 0
+        empilhados = 1
+        while fronteira:
+            if not alvos.isdisjoint(fronteira):
+                registrar_busca(expandidos, empilhados)
+                return self.pos(min(alvos.intersection(fronteira))), d
+            d += 1
+            proxima = []
+            for current in fronteira:
+                for off in offsets:
+                    neighbor = current + off
+                    if livre[neighbor] and visto[neighbor] != busca:
+                        visto[neighbor] = busca
+                        proxima.append(neighbor)
+            expandidos += len(fronteira)
+            empilhados += len(proxima)
+            fronteira = proxima
+
+        registrar_busca(expandidos, empilhados)
+        return None, float('inf')
+
+    def distancias_multi_target(self, start, alvos):
+        """
+        Distância de start até cada alvo alcançável, como {(x, y): distância}.
+        BFS por níveis que para assim que todos os alvos forem encontrados.
+        """
+        restantes = {self.id(a) for a in alvos}
+        livre = self.livre
+        offsets = self.offsets
+        busca = self._nova_busca()
+        visto = self._visto
+        encontrados = {}
+
+        s = self.id(start)
+        visto[s] = busca
+        fronteira = [s]
+        d = 0
+        expandidos = 0
+        empilhados = 1
+        while fronteira and restantes:
+            if not restantes.isdisjoint(fronteira):
+                for current in sorted(restantes.intersection(fronteira)):
+                    encontrados[self.pos(current)] = d
+                    restantes.remove(current)
+                if not restantes:
+                    break
+            d += 1
+            proxima = []
+            for current in fronteira:
+                for off in offsets:
+                    neighbor = current + off
+                    if livre[neighbor] and visto[neighbor] != busca:
+                        visto[neighbor] = busca
+                        proxima.append(neighbor)
+            expandidos += len(fronteira)
+            empilhados += len(proxima)
+            fronteira = proxima
+
+        registrar_busca(expandidos, empilhados)
+        return encontrados
+
+    def distancia(self, start, goal):
+        """
+        Distância entre start e goal por BFS bidirecional (float('inf') se não houver caminho).
+        A cada rodada expande um nível inteiro da fronteira menor; no primeiro nível em que as
+        buscas se tocam, o menor encontro daquele nível é a distância ótima.
+        """
+        s = self.id(start)
+        g = self.id(goal)
+        if s == g:
+            return 0
+        livre = self.livre
+        offsets = self.offsets
+        busca = self._nova_busca()
+        visto_a, dist_a = self._visto, self.gscore
+        visto_b, dist_b = self._fechado, self.came_from  # reaproveitados como lado do destino
+
+        visto_a[s] = busca
+        dist_a[s] = 0
+        visto_b[g] = busca
+        dist_b[g] = 0
+        fronteira_a, fronteira_b = [s], [g]
+        expandidos = 0
+        empilhados = 2
+        while fronteira_a and fronteira_b:
+            if len(fronteira_b) < len(fronteira_a):
+                fronteira_a, fronteira_b = fronteira_b, fronteira_a
+                visto_a, visto_b = visto_b, visto_a
+                dist_a, dist_b = dist_b, dist_a
+            melhor = float('inf')
+            proxima = []
+            for current in fronteira_a:
+                d = dist_a[current] + 1
+                for off in offsets:
+                    neighbor = current + off
+                    if not livre[neighbor]:
+                        continue
+                    if visto_b[neighbor] == busca:
+                        melhor = min(melhor, d + dist_b[neighbor])
+                    elif visto_a[neighbor] != busca:
+                        visto_a[neighbor] = busca
+                        dist_a[neighbor] = d
+                        proxima.append(neighbor)
+            expandidos += len(fronteira_a)
+            empilhados += len(proxima)
+            if melhor != float('inf'):
+                registrar_busca(expandidos, empilhados)
+                return melhor
+            fronteira_a = proxima
+
+        registrar_busca(expandidos, empilhados)
+        return float('inf')
+
+
+    def busca_com_bateria(self, start, bateria, alvos, recarregador=None, bateria_recarga=BATERIA_RECARGA,
+                          passo_bateria=1, penalidade=None):
+        """
+        Caminho de menor custo de start até algum dos alvos considerando a bateria, como no Maze:
+        cada passo gasta 1 de bateria e custa 1 se a bateria continua >= 0, ou 5 se não; pisar
+        no recarregador volta a bateria para bateria_recarga. Desvios pelo recarregador entram
+        no caminho quando compensam.
+
+        O estado é (célula, bateria), com todas as baterias negativas num único estado (a partir
+        daí todo passo custa 5). Dijkstra em ordem de custo e, no empate, de maior bateria: um
+        estado é descartado se a célula já foi fechada com bateria na mesma faixa ou maior
+        (dominância), com faixas de passo_bateria unidades. A faixa fechada de cada célula fica
+        nos arrays de trabalho do Grid, com o mesmo carimbo de geração das outras buscas, e a
+        memória extra é só a dos estados empilhados; com passo_bateria > 1 a busca troca um
+        pouco de precisão por menos estados.
+
+        penalidade(alvo, bateria), se dada, é somada ao custo de chegar a cada alvo (por
+        exemplo, o excesso de custo da volta ao recarregador com a bateria que sobra), e o alvo
+        escolhido é o de menor soma. Retorna (custo, caminho, alvo), sem a penalidade no custo e
+        com o caminho sem start, ou (float('inf'), [], None).
+        """
+        alvo_de = {self.id(a): a for a in alvos}
+        livre = self.livre
+        offsets = self.offsets
+        recarga = self.id(recarregador) if recarregador is not None else -1
+        inicio = self.id(start)
+        # fechada[cell]: maior faixa de bateria já fechada na célula (-1: negativa), válida só se
+        # visto[cell] é o carimbo desta busca
+        busca = self._nova_busca()
+        visto = self._visto
+        fechada = self.gscore
+        bateria = max(bateria, -1)
+        # Estados empilhados: célula e índice do estado anterior, para refazer o caminho
+        celulas = [inicio]
+        pais = [-1]
+        heap = [(0, -bateria, 0)]
+        melhor_total = float('inf')
+        melhor_estado = -1
+        melhor_custo = float('inf')
+        expandidos = 0
+        while heap:
+            custo, b, estado = heapq.heappop(heap)
+            if custo >= melhor_total:
+                break
+            b = -b
+            cell = celulas[estado]
+            faixa = b // passo_bateria if b >= 0 else -1
+            if visto[cell] == busca and faixa <= fechada[cell]:
+                continue
+            visto[cell] = busca
+            fechada[cell] = faixa
+            expandidos += 1
+            if estado and cell in alvo_de:
+                total = custo + (penalidade(alvo_de[cell], b) if penalidade else 0)
+                if total < melhor_total:
+                    melhor_total = total
+                    melhor_estado = estado
+                    melhor_custo = custo
+            for off in offsets:
+                neighbor = cell + off
+                if not livre[neighbor]:
+                    continue
+                nb = b - 1
+                ncusto = custo + (1 if nb >= 0 else 5)
+                if neighbor == recarga:
+                    nb = bateria_recarga
+                elif nb < 0:
+                    nb = -1
+                if visto[neighbor] == busca and (nb // passo_bateria if nb >= 0 else -1) <= fechada[neighbor]:
+                    continue
+                celulas.append(neighbor)
+                pais.append(estado)
+                heapq.heappush(heap, (ncusto, -nb, len(celulas) - 1))
+        registrar_busca(expandidos, len(celulas))
+
+        if melhor_estado < 0:
+            return float('inf'), [], None
+        caminho = []
+        estado = melhor_estado
+        while estado > 0:
+            caminho.append(self.pos(celulas[estado]))
+            estado = pais[estado]
+        caminho.reverse()
+        return melhor_custo, caminho, alvo_de[celulas[melhor_estado]]
+
+    def _livre_np(self):
+        if self._livre_np_cache is None:
+            self._livre_np_cache = np.frombuffer(bytes(self.livre), dtype=np.uint8).astype(bool)
+        return self._livre_np_cache
+
+    def campo_distancias_np(self, origem):
+        """Campo de distâncias de origem até todas as células (vetor plano indexado pelo id)."""
+        return self.campos_distancias_np([origem])[0]
+
+    def campos_distancias_np(self, origens):
+        """
+        Campos de distância de várias origens de uma vez, com expansão em frente de onda
+        vetorizada. Os campos das k origens ficam lado a lado em um único vetor de k * W * W
+        posições (a borda de obstáculos impede que um campo vaze para o vizinho), e a cada
+        nível a fronteira inteira de todas as origens é expandida com operações de array,
+        sem laço por célula.
+        Retorna um array (len(origens), W * W) de int32 indexado pelo id da célula (-1 = inalcançável).
+        """
+        if np is None:
+            raise RuntimeError("numpy não está instalado; use TabelaDistancias, que faz BFS pura")
+        n = self.W * self.W
+        k = len(origens)
+        livre = self._livre_np()
+        offsets = np.array(self.offsets, dtype=np.int64)
+        dist = np.full(k * n, -1, dtype=np.int32)
+        fronteira = np.array([i * n + self.id(o) for i, o in enumerate(origens)], dtype=np.int64)
+        fronteira = fronteira[livre[fronteira % n]]
+        dist[fronteira] = 0
+        # Remove duplicatas sem ordenar: cada célula guarda a posição da sua última ocorrência
+        # e só essa ocorrência é mantida na próxima fronteira.
+        marca = np.empty(k * n, dtype=np.int64)
+        d = 0
+        expandidos = 0
+        empilhados = int(fronteira.size)
+        while fronteira.size:
+            d += 1
+            expandidos += int(fronteira.size)
+            vizinhos = (fronteira[:, None] + offsets).ravel()
+            vizinhos = vizinhos[livre[vizinhos % n]]
+            vizinhos = vizinhos[dist[vizinhos] < 0]
+            posicoes = np.arange(vizinhos.size)
+            marca[vizinhos] = posicoes
+            vizinhos = vizinhos[marca[vizinhos] == posicoes]
+            dist[vizinhos] = d
+            empilhados += int(vizinhos.size)
+            fronteira = vizinhos
+        registrar_busca(expandidos, empilhados)
+        return dist.reshape(k, n)
+
+class TabelaDistancias:
+    """
+    Distâncias de cada ponto de interesse (pacotes, metas, recarregador) até todas as células
+    livres do grid. Os pontos de interesse não se movem, então cada campo é calculado uma única
+    vez por World, com uma BFS a partir do ponto, na primeira vez em que é consultado.
+    Como o grid é não direcionado, distancia(poi, pos) é também a distância de pos até poi.
+
+    Um campo ocupa uma entrada por célula do grid: World.coletar/entregar descartam os dos
+    pontos que saem do mundo, e as consultas sobre muitos pontos ainda sem campo (mais de
+    LIMITE_CAMPOS) respondem com uma BFS a partir da posição, sem criar campos.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self._campos = {}  # id da célula do poi -> campo
+        self._compartilhada = False  # _campos também é de outra tabela (veja copia)
+
+    def copia(self, grid):
+        """
+        Tabela sobre grid (uma cópia do mesmo mapa, veja Grid.copia) que compartilha os campos:
+        os calculados por qualquer uma servem às duas. A cópia não descarta campos.
+        """
+        copia = TabelaDistancias(grid)
+        copia._campos = self._campos
+        copia._compartilhada = True
+        return copia
+
+    def descartar(self, poi):
+        """Libera o campo de poi (o ponto saiu do mundo); um novo campo é criado se for consultado."""
+        if not self._compartilhada:
+            self._campos.pop(self.grid.id(poi), None)
+
+    def _faltando(self, pois):
+        """pois sem campo, ou None se forem mais de LIMITE_CAMPOS."""
+        W = self.grid.W
+        campos = self._campos
+        faltando = []
+        for poi in pois:
+            if (poi[0] + 1) * W + poi[1] + 1 not in campos:
+                faltando.append(poi)
+                if len(faltando) > LIMITE_CAMPOS:
+                    return None
+        return faltando
+
+    def precalcular(self, pois, lote=32):
+        """
+        Calcula de uma vez os campos ainda ausentes de pois. Em grids grandes, com numpy
+        disponível, os campos são gerados em lotes pela frente de onda vetorizada.
+        """
+        grid = self.grid
+        faltando = list({grid.id(poi): poi for poi in pois if grid.id(poi) not in self._campos}.values())
+        if np is None or grid.size < LIMIAR_NUMPY:
+            for poi in faltando:
+                self._campos[grid.id(poi)] = self._bfs(poi)
+            return
+        for i in range(0, len(faltando), lote):
+            bloco = faltando[i:i + lote]
+            for poi, campo in zip(bloco, grid.campos_distancias_np(bloco)):
+                self._campos[grid.id(poi)] = campo
+
+    def campo(self, poi):
+        """Array de distâncias indexado pelo id da célula (-1 = inalcançável)."""
+        chave = self.grid.id(poi)
+        campo = self._campos.get(chave)
+        if campo is None:
+            if np is not None and self.grid.size >= LIMIAR_NUMPY:
+                campo = self.grid.campo_distancias_np(poi)
+            else:
+                campo = self._bfs(poi)
+            self._campos[chave] = campo
+        return campo
+
+    def _bfs(self, poi):
+        grid = self.grid
+        livre = grid.livre
+        offsets = grid.offsets
+        dist = array('i', [-1]) * len(livre)
+        origem = grid.id(poi)
+        dist[origem] = 0
+        fronteira = [origem]
+        d = 0
+        expandidos = 0
+        empilhados = 1
+        while fronteira:
+            d += 1
+            proxima = []
+            for cell in fronteira:
+                for off in offsets:
+                    neighbor = cell + off
+                    if livre[neighbor] and dist[neighbor] < 0:
+                        dist[neighbor] = d
+                        proxima.append(neighbor)
+            expandidos += len(fronteira)
+            empilhados += len(proxima)
+            fronteira = proxima
+        registrar_busca(expandidos, empilhados)
+        return dist
+
+    def distancia(self, poi, pos):
+        # Caminho quente das estratégias: ids calculados direto, sem passar por Grid.id
+        W = self.grid.W
+        campo = self._campos.get((poi[0] + 1) * W + poi[1] + 1)
+        if campo is None:
+            campo = self.campo(poi)
+        d = int(campo[(pos[0] + 1) * W + pos[1] + 1])
+        return d if d >= 0 else float('inf')
+
+    def proximo_passo(self, poi, pos):
+        """Vizinho de pos um passo mais perto de poi, ou None se pos já é poi ou não o alcança."""
+        campo = self.campo(poi)
+        cell = self.grid.id(pos)
+        d = int(campo[cell])
+        if d <= 0:
+            return None
+        for off in self.grid.offsets:
+            if campo[cell + off] == d - 1:
+                return self.grid.pos(cell + off)
+        return None
+
+    def distancias(self, pos, pois):
+        """{(x, y): distância} de pos até cada poi alcançável, na ordem de pois."""
+        faltando = self._faltando(pois)
+        if faltando is None:
+            encontrados = self.grid.distancias_multi_target(pos, pois)
+            return {(poi[0], poi[1]): encontrados[(poi[0], poi[1])] for poi in pois if (poi[0], poi[1]) in encontrados}
+        if faltando:
+            self.precalcular(faltando)
+        W = self.grid.W
+        campos = self._campos
+        cell = (pos[0] + 1) * W + pos[1] + 1
+        resultado = {}
+        for poi in pois:
+            d = int(campos[(poi[0] + 1) * W + poi[1] + 1][cell])
+            if d >= 0:
+                resultado[(poi[0], poi[1])] = d
+        return resultado
+
+    def matriz(self, pos, pois, lote=32):
+        """
+        Matriz de distâncias entre pos (índice 0) e pois (índices 1 em diante), como lista de
+        linhas: D[a][b] é a distância do ponto a ao ponto b (inf se não há caminho). pos não
+        ganha campo: a sua linha vem das colunas, pela simetria do grid.
+        Com até LIMITE_CAMPOS pois sem campo, os que faltam são calculados e guardados como em
+        distancias; com mais, cada linha sem campo sai de uma busca que não fica na tabela: em
+        grids grandes, com numpy, a frente de onda vetorizada em lotes de `lote` campos,
+        descartados assim que as linhas são lidas; nos demais, distancias_multi_target, que
+        para ao alcançar todos os pontos.
+        """
+        grid = self.grid
+        W = grid.W
+        inf = float('inf')
+        pontos = [pos] + list(pois)
+        cells = [(p[0] + 1) * W + p[1] + 1 for p in pontos]
+        faltando = self._faltando(pois)
+        if faltando:
+            self.precalcular(faltando)
+        campos = self._campos
+        D = [None] * len(pontos)
+        sem_campo = []
+        for a in range(1, len(pontos)):
+            campo = campos.get(cells[a])
+            if campo is None:
+                sem_campo.append(a)
+                continue
+            D[a] = [d if d >= 0 else inf for d in (int(campo[c]) for c in cells)]
+        if np is not None and grid.size >= LIMIAR_NUMPY:
+            indices = np.array(cells)
+            for i in range(0, len(sem_campo), lote):
+                bloco = sem_campo[i:i + lote]
+                for a, campo in zip(bloco, grid.campos_distancias_np([pontos[a] for a in bloco])):
+                    D[a] = [d if d >= 0 else inf for d in campo[indices].tolist()]
+        else:
+            for a in sem_campo:
+                encontrados = grid.distancias_multi_target(pontos[a], pontos)
+                D[a] = [encontrados.get((p[0], p[1]), inf) for p in pontos]
+        D[0] = [0] + [D[a][0] for a in range(1, len(pontos))]
+        return D
+
+    def mais_proximo(self, pos, pois):
+        """
+        (poi, distância) do poi mais próximo de pos, ou (None, float('inf')).
+        Empates são resolvidos pela menor posição (x, y), como nas buscas com heap.
+        """
+        faltando = self._faltando(pois)
+        if faltando is None:
+            return self.grid.dijkstra_multi_target(pos, pois)
+        if faltando:
+            self.precalcular(faltando)
+        W = self.grid.W
+        campos = self._campos
+        cell = (pos[0] + 1) * W + pos[1] + 1
+        melhor = None
+        melhor_d = -1
+        for poi in pois:
+            campo = campos.get((poi[0] + 1) * W + poi[1] + 1)
+            if campo is None:
+                campo = self.campo(poi)
+            d = int(campo[cell])
+            if d < 0:
+                continue
+            if melhor is None or d < melhor_d or (d == melhor_d and (poi[0], poi[1]) < (melhor[0], melhor[1])):
+                melhor_d = d
+                melhor = poi
+        if melhor is None:
+            return None, float('inf')
+        return melhor, melhor_d
+
+
+class CacheCaminhos:
+    """
+    Cache LRU de caminhos A* com tamanho máximo, chaveado por (versão do mundo, início, destino).
+    A versão faz parte da chave, então uma alteração no grid invalida tudo o que foi calculado
+    antes dela; World.alterar_celula também esvazia o cache para liberar a memória.
+    """
+
+    def __init__(self, tamanho_maximo=4096):
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            self.falhas += 1
+            return None
+        self._itens.move_to_end(chave)
+        self.acertos += 1
+        return item
+
+    def guardar(self, chave, item):
+        self._itens[chave] = item
+        self._itens.move_to_end(chave)
+        if len(self._itens) > self.tamanho_maximo:
+            self._itens.popitem(last=False)
+
+    def limpar(self):
+        self._itens.clear()
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _ler_arquivo(caminho):
+    if caminho.endswith(".parquet"):
+        return pd.read_parquet(caminho)
+    if caminho.endswith(".npz"):
+        with np.load(caminho, allow_pickle=False) as dados:
+            return pd.DataFrame({coluna: dados[coluna] for coluna in dados.files})
+    return pd.read_csv(caminho)
+
+
+def carregar_resultados(caminho="resultados.csv"):
+    """
+    Lê os resultados do main.py em um DataFrame.
+
+    caminho pode ser um arquivo (.csv, .parquet ou .npz) ou o diretório de um dataset gravado
+    com --formato parquet/npz. No diretório, todas as partes de todas as varreduras são lidas
+    e concatenadas, e o nome da partição vira a coluna "varredura".
+    """
+    if not os.path.isdir(caminho):
+        return _ler_arquivo(caminho)
+
+    partes = []
+    for raiz, diretorios, arquivos in os.walk(caminho):
+        diretorios.sort()
+        for nome in sorted(arquivos):
+            if not nome.endswith((".parquet", ".npz", ".csv")):
+                continue
+            df = _ler_arquivo(os.path.join(raiz, nome))
+            particao = os.path.basename(raiz)
+            if particao.startswith("varredura="):
+                df["varredura"] = particao.split("=", 1)[1]
+            partes.append(df)
+    if not partes:
+        raise FileNotFoundError(f"nenhum arquivo de resultados em {caminho}")
+    return pd.concat(partes, ignore_index=True)
+
+
+def por_perfil(df, perfil=None):
+    """
+    Separa os resultados por perfil de bateria, como lista de (perfil, DataFrame), para que
+    médias e comparações não misturem episódios de perfis diferentes na mesma seed. Com
+    perfil, devolve só esse grupo. Resultados gravados antes da coluna perfil_bateria formam
+    um único grupo, com perfil None.
+    """
+    if "perfil_bateria" not in df.columns:
+        if perfil is not None:
+            raise ValueError("os resultados não têm a coluna perfil_bateria")
+        return [(None, df)]
+    if perfil is not None:
+        filtrado = df[df["perfil_bateria"] == perfil]
+        if filtrado.empty:
+            raise ValueError(f"nenhum resultado com perfil_bateria={perfil}")
+        return [(perfil, filtrado)]
+    return [(valor, grupo) for valor, grupo in df.groupby("perfil_bateria", sort=True)]
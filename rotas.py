@@ -0,0 +1,363 @@
+"""
+Planejamento do roteiro completo de coletas, entregas e recargas.
+
+O problema é um caixeiro-viajante com precedência: partindo da posição atual, o robô precisa
+visitar todas as metas, cada uma com pelo menos um pacote na carga, escolhendo quais pacotes
+coletar (qualquer subconjunto com o número necessário). O custo é o do Maze: cada passo custa 1
+enquanto a bateria não fica negativa e 5 depois disso, e passar pelo recarregador volta a
+bateria para BATERIA_RECARGA.
+
+Os nós são índices em uma matriz de distâncias D (D[a][b] = passos de a até b, inf se não há
+caminho, simétrica como o grid; todos os pacotes e metas devem ser alcançáveis a partir do
+início, só o recarregador pode não ser): o nó 0 é a posição inicial, `recarregador` é o índice
+do recarregador, e pacotes e metas são listas de índices. Uma sequência é a lista das paradas em pacotes/metas; as recargas
+são encaixadas depois, pela programação dinâmica de inserir_recargas.
+"""
+from pathfinding import BATERIA_RECARGA
+
+INF = float('inf')
+
+# Acima desse número de pacotes + metas a DP exata sobre subconjuntos fica cara: usa a
+# construção gulosa seguida de busca local (2-opt, or-opt e troca de pacotes). Os mundos padrão
+# (6 metas e 12 pacotes) já passam do limite: a DP exata só roda em mundos com poucos itens
+# ou ao replanejar quando restam poucos.
+LIMITE_EXATO = 12
+
+# Depois da busca local sobre a distância, o roteiro é polido com o custo com bateria. Cada
+# avaliação é a DP O(m²) de inserir_recargas, então o polimento gasta no máximo
+# ORCAMENTO_BATERIA // m² avaliações e é pulado quando esse número não chega a m (roteiros
+# muito longos, em que nem uma passada pelas paradas caberia): sem ele o roteiro deixa de
+# aproveitar as recargas, mas o custo por avaliação cresce com m².
+ORCAMENTO_BATERIA = 5_000_000
+
+
+def custo_trecho(passos, bateria):
+    """Custo de andar `passos` começando com `bateria` (mesma conta de Maze.avancar_segmento)."""
+    com_carga = min(max(bateria, 0), passos)
+    return com_carga + 5 * (passos - com_carga)
+
+
+def inserir_recargas(D, sequencia, recarregador, bateria):
+    """
+    Escolhe em quais trechos da sequência desviar pelo recarregador, minimizando o custo total.
+
+    Cada origem de um estirão sem recarga é o início (com `bateria`) ou a passagem pelo
+    recarregador no trecho i (com BATERIA_RECARGA); a DP em O(m²) escolhe a melhor origem para
+    cada recarga e para o fim. Retorna (custo, trechos com recarga).
+    """
+    paradas = [0] + list(sequencia)
+    m = len(sequencia)
+    # acumulado[k]: passos do início até a parada k sem desvios
+    acumulado = [0] * (m + 1)
+    for k in range(1, m + 1):
+        acumulado[k] = acumulado[k - 1] + D[paradas[k - 1]][paradas[k]]
+    # Uma origem i é o início (i = 0, com `bateria`) ou a saída do recarregador no trecho i,
+    # rumo à parada i (com BATERIA_RECARGA). base[i] + acumulado[k]: passos da origem até a
+    # parada k, para k >= i.
+    base = [0] * (m + 1)
+    carga_origem = [bateria] + [BATERIA_RECARGA] * m
+    if recarregador is not None:
+        para_recarga = [D[no][recarregador] for no in paradas]
+        for i in range(1, m + 1):
+            base[i] = D[recarregador][paradas[i]] - acumulado[i]
+
+    # melhor[j]: custo até chegar ao recarregador no trecho j (j = 0: o início)
+    melhor = [INF] * (m + 1)
+    anterior = [None] * (m + 1)
+    melhor[0] = 0
+    if recarregador is not None:
+        for j in range(1, m + 1):
+            ate_recarga = acumulado[j - 1] + para_recarga[j - 1]
+            if ate_recarga == INF:
+                continue
+            melhor_j = INF
+            for i in range(j):
+                if melhor[i] == INF:
+                    continue
+                passos = base[i] + ate_recarga
+                b = carga_origem[i]
+                com_carga = b if b < passos else passos
+                if com_carga < 0:
+                    com_carga = 0
+                custo = melhor[i] + 5 * passos - 4 * com_carga
+                if custo < melhor_j:
+                    melhor_j = custo
+                    anterior[j] = i
+            melhor[j] = melhor_j
+
+    total = INF
+    origem = None
+    for i in range(m + 1):
+        if melhor[i] == INF:
+            continue
+        custo = melhor[i] + custo_trecho(base[i] + acumulado[m], carga_origem[i])
+        if custo < total:
+            total = custo
+            origem = i
+
+    recargas = []
+    while origem:
+        recargas.append(origem)
+        origem = anterior[origem]
+    recargas.reverse()
+    return total, recargas
+
+
+def viavel(sequencia, eh_meta, carga):
+    """Cada meta da sequência encontra pelo menos um pacote na carga."""
+    for no in sequencia:
+        if eh_meta[no]:
+            if carga <= 0:
+                return False
+            carga -= 1
+        else:
+            carga += 1
+    return True
+
+
+def _dp_exata(D, pacotes, metas, carga, coletas):
+    """
+    Menor distância (sem considerar bateria) por DP sobre subconjuntos (Held-Karp com a
+    restrição de carga). Retorna a sequência ótima ou None se não houver.
+    """
+    nos = list(pacotes) + list(metas)
+    n = len(nos)
+    bit_meta = 0
+    for b in range(len(pacotes), n):
+        bit_meta |= 1 << b
+    todas_metas = bit_meta
+    # custo[(mascara, ultimo)] = (distância, anterior); ultimo = -1 é o início
+    custo = {(0, -1): (0, None)}
+    fronteira = [(0, -1)]
+    melhor_final = None
+    while fronteira:
+        proxima = {}
+        for estado in fronteira:
+            mascara, ultimo = estado
+            dist = custo[estado][0]
+            origem = 0 if ultimo < 0 else nos[ultimo]
+            metas_feitas = bin(mascara & bit_meta).count("1")
+            coletados = bin(mascara & ~bit_meta).count("1")
+            if mascara & todas_metas == todas_metas:
+                if melhor_final is None or dist < custo[melhor_final][0]:
+                    melhor_final = estado
+                continue
+            for b in range(n):
+                if mascara >> b & 1:
+                    continue
+                if bit_meta >> b & 1:
+                    if carga + coletados - metas_feitas <= 0:
+                        continue
+                elif coletados >= coletas:
+                    continue
+                d = D[origem][nos[b]]
+                if d == INF:
+                    continue
+                novo = (mascara | 1 << b, b)
+                atual = custo.get(novo)
+                if atual is None or dist + d < atual[0]:
+                    custo[novo] = (dist + d, estado)
+                    proxima[novo] = True
+        fronteira = list(proxima)
+    if melhor_final is None:
+        return None
+    sequencia = []
+    estado = melhor_final
+    while estado[1] >= 0:
+        sequencia.append(nos[estado[1]])
+        estado = custo[estado][1]
+    sequencia.reverse()
+    return sequencia
+
+
+def _gulosa(D, pacotes, metas, carga, coletas):
+    """Vizinho mais próximo entre as paradas permitidas pela carga."""
+    livres_pacotes = list(pacotes)
+    livres_metas = list(metas)
+    sequencia = []
+    atual = 0
+    coletados = 0
+    while livres_metas:
+        candidatos = []
+        if coletados < coletas:
+            candidatos += livres_pacotes
+        if carga > 0:
+            candidatos += livres_metas
+        candidatos = [c for c in candidatos if D[atual][c] < INF]
+        if not candidatos:
+            return None
+        proximo = min(candidatos, key=lambda c: (D[atual][c], c))
+        if proximo in livres_metas:
+            livres_metas.remove(proximo)
+            carga -= 1
+        else:
+            livres_pacotes.remove(proximo)
+            carga += 1
+            coletados += 1
+        sequencia.append(proximo)
+        atual = proximo
+    return sequencia
+
+
+def _busca_local(D, sequencia, pacotes, eh_meta, carga, avaliar=None, max_rodadas=50, max_avaliacoes=None):
+    """
+    Melhora a sequência até não haver movimento que reduza o custo: 2-opt (inverte um trecho),
+    or-opt (move blocos de 1 a 3 paradas) e troca de um pacote coletado por um não usado.
+    Aceita a primeira melhora encontrada. O custo é a distância total, ou avaliar(sequência)
+    (inf = inviável) se for dada.
+
+    Cada movimento é medido antes pela diferença de distância nas arestas que ele troca, em
+    O(1) (D simétrica). O custo com bateria nunca é menor que a distância percorrida (os
+    desvios pelo recarregador não encurtam o caminho e cada passo custa pelo menos 1), então
+    avaliar só é chamada para as candidatas viáveis cuja distância fica abaixo do melhor
+    custo; com max_avaliacoes, a busca para ao chegar a esse número de chamadas.
+    """
+    sequencia = list(sequencia)
+    m = len(sequencia)
+    distancia = D[0][sequencia[0]] + sum(D[a][b] for a, b in zip(sequencia, sequencia[1:]))
+    melhor = distancia if avaliar is None else avaliar(sequencia)
+    restantes = INF if max_avaliacoes is None else max_avaliacoes
+    for _ in range(max_rodadas):
+        melhorou = False
+        # 2-opt: inverter sequencia[i..j] troca as arestas (a, b) e (c, d) por (a, c) e (b, d)
+        for i in range(m - 1):
+            for j in range(i + 1, m):
+                a = sequencia[i - 1] if i else 0
+                b, c = sequencia[i], sequencia[j]
+                nova = distancia + D[a][c] - D[a][b]
+                if j + 1 < m:
+                    d = sequencia[j + 1]
+                    nova += D[b][d] - D[c][d]
+                if nova >= melhor:
+                    continue
+                candidata = sequencia[:i] + sequencia[i:j + 1][::-1] + sequencia[j + 1:]
+                if not viavel(candidata, eh_meta, carga):
+                    continue
+                if avaliar is None:
+                    custo = nova
+                else:
+                    custo = avaliar(candidata)
+                    restantes -= 1
+                if custo < melhor:
+                    sequencia, melhor, distancia, melhorou = candidata, custo, nova, True
+                if restantes <= 0:
+                    return sequencia, melhor
+        # or-opt: tirar o bloco liga anterior a seguinte; reinseri-lo o coloca entre x e y
+        for tamanho in (1, 2, 3):
+            for i in range(m - tamanho + 1):
+                bloco = sequencia[i:i + tamanho]
+                resto = sequencia[:i] + sequencia[i + tamanho:]
+                primeiro, ultimo = bloco[0], bloco[-1]
+                anterior = sequencia[i - 1] if i else 0
+                sem_bloco = distancia - D[anterior][primeiro]
+                if i + tamanho < m:
+                    seguinte = sequencia[i + tamanho]
+                    sem_bloco += D[anterior][seguinte] - D[ultimo][seguinte]
+                for k in range(len(resto) + 1):
+                    if k == i:
+                        continue
+                    x = resto[k - 1] if k else 0
+                    nova = sem_bloco + D[x][primeiro]
+                    if k < len(resto):
+                        y = resto[k]
+                        nova += D[ultimo][y] - D[x][y]
+                    if nova >= melhor:
+                        continue
+                    candidata = resto[:k] + bloco + resto[k:]
+                    if not viavel(candidata, eh_meta, carga):
+                        continue
+                    if avaliar is None:
+                        custo = nova
+                    else:
+                        custo = avaliar(candidata)
+                        restantes -= 1
+                    if custo < melhor:
+                        sequencia, melhor, distancia, melhorou = candidata, custo, nova, True
+                        break
+                    if restantes <= 0:
+                        return sequencia, melhor
+        # troca de pacotes: pacote por pacote mantém a carga, então a troca é sempre viável
+        usados = set(sequencia)
+        for i, no in enumerate(sequencia):
+            if eh_meta[no]:
+                continue
+            anterior = sequencia[i - 1] if i else 0
+            seguinte = sequencia[i + 1] if i + 1 < m else None
+            for outro in pacotes:
+                if outro in usados:
+                    continue
+                nova = distancia + D[anterior][outro] - D[anterior][no]
+                if seguinte is not None:
+                    nova += D[outro][seguinte] - D[no][seguinte]
+                if nova >= melhor:
+                    continue
+                candidata = sequencia[:i] + [outro] + sequencia[i + 1:]
+                if avaliar is None:
+                    custo = nova
+                else:
+                    custo = avaliar(candidata)
+                    restantes -= 1
+                if custo < melhor:
+                    usados.discard(no)
+                    usados.add(outro)
+                    sequencia, melhor, distancia, melhorou = candidata, custo, nova, True
+                    no = outro
+                if restantes <= 0:
+                    return sequencia, melhor
+        if not melhorou:
+            break
+    return sequencia, melhor
+
+
+def planejar_rota(D, pacotes, metas, recarregador, carga=0, bateria=BATERIA_RECARGA, limite_exato=LIMITE_EXATO,
+                  orcamento_bateria=ORCAMENTO_BATERIA):
+    """
+    Planeja o roteiro partindo do nó 0 com `carga` pacotes e `bateria`, visitando todas as
+    metas e coletando os pacotes que faltam para elas.
+
+    A ordem inicial é a de menor distância pela DP exata quando há até limite_exato pacotes +
+    metas, ou a gulosa caso contrário; nos dois casos a busca local sobre a distância a refina.
+    Em seguida a busca local usa o custo com bateria, com até orcamento_bateria // m²
+    avaliações (pulada se não couberem m). As recargas são inseridas no fim.
+
+    Retorna (custo, nós na ordem de visita, com o recarregador onde houver recarga), ou
+    (inf, []) se as metas não forem alcançáveis.
+    """
+    coletas = max(0, len(metas) - carga)
+    if not metas:
+        return 0, []
+    if len(pacotes) < coletas:
+        return INF, []
+    eh_meta = {no: False for no in pacotes}
+    eh_meta.update({no: True for no in metas})
+
+    sequencia = None
+    if len(pacotes) + len(metas) <= limite_exato:
+        sequencia = _dp_exata(D, pacotes, metas, carga, coletas)
+    if sequencia is None:
+        sequencia = _gulosa(D, pacotes, metas, carga, coletas)
+    if sequencia is None:
+        return INF, []
+
+    def por_custo(seq):
+        if not viavel(seq, eh_meta, carga):
+            return INF
+        return inserir_recargas(D, seq, recarregador, bateria)[0]
+
+    sequencia, _ = _busca_local(D, sequencia, pacotes, eh_meta, carga)
+    m = len(sequencia)
+    avaliacoes = orcamento_bateria // (m * m)
+    if avaliacoes >= m:
+        sequencia, custo = _busca_local(D, sequencia, pacotes, eh_meta, carga, por_custo, max_avaliacoes=avaliacoes)
+    else:
+        custo = por_custo(sequencia)
+    if custo == INF:
+        return INF, []
+
+    _, recargas = inserir_recargas(D, sequencia, recarregador, bateria)
+    rota = []
+    for k, no in enumerate(sequencia, start=1):
+        if k in recargas:
+            rota.append(recarregador)
+        rota.append(no)
+    return custo, rota